@@ -0,0 +1,291 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+from meeting_processor import MeetingProcessor
+
+SHARD_SIZES = ('day', 'week')
+DEFAULT_WORKERS = 4
+
+class Shard(NamedTuple):
+    start: date
+    end: date  # Exclusive
+
+    @property
+    def key(self) -> str:
+        return self.start.isoformat()
+
+def make_shards(start: date, end: date, size: str = 'week') -> List[Shard]:
+    """Split the days start..end (inclusive) into day or week shards.
+
+    Week shards run Monday to Sunday, so the first and last may be shorter.
+    """
+    shards = []
+    last = end + timedelta(days=1)
+    current = start
+    while current < last:
+        step = 7 - current.weekday() if size == 'week' else 1
+        shard_end = min(current + timedelta(days=step), last)
+        shards.append(Shard(current, shard_end))
+        current = shard_end
+    return shards
+
+class BackfillCheckpoint:
+    """Per-shard completion of a backfill, saved after every shard."""
+
+    def __init__(self, path: str, start: date, end: date, shard_size: str):
+        self.path = path
+        self.range = {'start': start.isoformat(), 'end': end.isoformat(), 'shard': shard_size}
+        self.shards: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str, start: date, end: date, shard_size: str) -> "BackfillCheckpoint":
+        """Load the checkpoint at path, or start a new one if there is none."""
+        checkpoint = cls(path, start, end, shard_size)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return checkpoint
+
+        if data.get('range') != checkpoint.range:
+            raise ValueError(
+                f"Checkpoint {path} belongs to another backfill ({data.get('range')}); "
+                "use a different --checkpoint or --restart"
+            )
+        checkpoint.shards = data.get('shards', {})
+        return checkpoint
+
+    @staticmethod
+    def saved_end(path: str) -> Optional[date]:
+        """The last day of the backfill recorded at path, or None if there is none."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return date.fromisoformat(json.load(f)['range']['end'])
+        except FileNotFoundError:
+            return None
+
+    def is_done(self, key: str) -> bool:
+        return self.shards.get(key, {}).get('status') == 'done'
+
+    def mark(self, key: str, **details):
+        """Record the outcome of a shard and write the checkpoint atomically."""
+        with self._lock:
+            self.shards[key] = dict(details, updated=datetime.now().isoformat(timespec='seconds'))
+            data = json.dumps({'version': 1, 'range': self.range, 'shards': self.shards}, indent=1, sort_keys=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+
+class Backfill:
+    """Process a date range in day or week shards, several at a time.
+
+    The processor is initialized once; its clients, task context and
+    matcher are shared by the shards. Each shard's outcome is recorded in
+    the checkpoint file, so an interrupted backfill resumes with the
+    shards it had not finished, skipping the meetings they had handled.
+    If the process dies without updating the checkpoint, entries already
+    in Intervals are still detected as duplicates.
+
+    Without an end date the backfill runs to today, and the day it resolved
+    to is kept in the checkpoint so that a rerun on a later day resumes the
+    same range.
+    """
+
+    def __init__(self, processor: MeetingProcessor, start: date, end: Optional[date],
+                 shard_size: str = 'week', workers: int = DEFAULT_WORKERS,
+                 checkpoint_path: Optional[str] = None, restart: bool = False):
+        self.processor = processor
+        self.start = start
+        self.end = end
+        self.shard_size = shard_size
+        self.workers = max(1, workers)
+        if not checkpoint_path:
+            range_name = f"{start}_{end}" if end else str(start)
+            checkpoint_path = f".backfill_{range_name}_{shard_size}.json"
+        self.checkpoint_path = checkpoint_path
+        self.restart = restart
+        self.stopping = threading.Event()
+        self.totals = {'shards': 0, 'failed': 0, 'meetings': 0, 'matched': 0, 'posted': 0, 'hours': 0.0}
+        self._lock = threading.Lock()
+
+    def run(self) -> bool:
+        """Run the backfill; False if initialization failed."""
+        if self.restart and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        if self.end is None:
+            self.end = BackfillCheckpoint.saved_end(self.checkpoint_path) or date.today()
+        checkpoint = BackfillCheckpoint.load(self.checkpoint_path, self.start, self.end, self.shard_size)
+
+        processor = self.processor
+        with processor.timed('initialize'):
+            if not processor.initialize():
+                return False
+
+        shards = make_shards(self.start, self.end, self.shard_size)
+        todo = [shard for shard in shards if not checkpoint.is_done(shard.key)]
+        print(f"\nBackfill {self.start} to {self.end}: {len(shards)} {self.shard_size} shard(s), "
+              f"{len(shards) - len(todo)} already done, {self.workers} worker(s)")
+        print(f"Checkpoint: {self.checkpoint_path}")
+
+        # Resumed runs add to the export of the earlier runs
+        processor.open_export(append=bool(checkpoint.shards))
+        started = time.perf_counter()
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        futures = {}
+        try:
+            for shard in todo:
+                handled = set(checkpoint.shards.get(shard.key, {}).get('handled', ()))
+                futures[executor.submit(self.process_shard, shard, handled)] = shard
+            for future in as_completed(futures):
+                shard = futures.pop(future)
+                entry = future.result()
+                checkpoint.mark(shard.key, **entry)
+                self.add_totals(entry)
+                if entry['status'] == 'failed':
+                    print(f"Shard {shard.start} failed: {entry['error']}")
+                elif entry['status'] == 'open':
+                    print(f"Shard {shard.start} is not over yet: {entry['posted']} posted so far, "
+                          "rerun later to log the rest")
+                elif entry['status'] == 'done':
+                    done = sum(1 for s in shards if checkpoint.is_done(s.key))
+                    print(f"[{done}/{len(shards)}] {shard.start} to {shard.end - timedelta(days=1)}: "
+                          f"{entry['meetings']} meetings, {entry['posted']} posted, {entry['hours']} hours")
+        except KeyboardInterrupt:
+            print("\nStopping after the meetings in progress; rerun the same command to resume")
+            self.stopping.set()
+            raise
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            # Record the shards that stopped part way after an interrupt
+            for future, shard in futures.items():
+                if not future.cancelled():
+                    entry = future.result()
+                    checkpoint.mark(shard.key, **entry)
+                    self.add_totals(entry)
+            if processor.task_matcher.prior:
+                processor.task_matcher.prior.save()
+            processor.close_export()
+            self.show_summary(time.perf_counter() - started)
+        return True
+
+    def process_shard(self, shard: Shard, handled: Set[str]) -> Dict[str, Any]:
+        """Process the meetings of one shard and return its checkpoint entry.
+
+        The status is 'done', 'stopped' (the backfill is stopping),
+        'failed' (an error, or time entries that could not be posted) or
+        'open' (the shard reaches past now, so meetings that have not ended
+        yet are left for a later run). A shard that did not finish lists
+        the event IDs of the meetings it handled, which the next run skips;
+        meetings whose entry failed to post are not among them.
+        """
+        base = self.processor
+        worker = MeetingProcessor(
+            post_entries=base.post_entries,
+            match_meetings=base.match_meetings,
+            graph_client=base.graph_client,
+            intervals_client=base.intervals_client,
+            task_matcher=base.task_matcher,
+            aggregate=base.aggregate,
+            use_prior=False
+        )
+        worker.current_user = base.current_user
+        worker.tasks = base.tasks
+        worker.result_writer = base.result_writer
+
+        status, error = 'done', None
+        results = []  # (event ID, result) of the meetings handled in this run
+        try:
+            with worker.timed('calendar'):
+                meetings = base.graph_client.fetch_meetings(
+                    datetime.combine(shard.start, datetime.min.time()),
+                    datetime.combine(shard.end, datetime.min.time())
+                )
+            meetings = [m for m in meetings if m.event_id not in handled]
+            if worker.match_meetings:
+                with worker.timed('existing_entries'):
+                    worker.load_existing_entries(meetings)
+
+            with worker.timed('process'):
+                for meeting in meetings:
+                    if self.stopping.is_set():
+                        status = 'stopped'
+                        break
+                    result = worker.handle_meeting(meeting)
+                    handled.add(meeting.event_id)
+                    if result is not None:
+                        results.append((meeting.event_id, result))
+            if worker.aggregate:
+                # A stopping shard still posts the days of the meetings it handled
+                with worker.timed('aggregate'):
+                    aggregated = worker.post_aggregated_entries()
+                worker.export_results(aggregated)
+        except Exception as e:
+            status, error = 'failed', str(e)
+            if worker.aggregate:
+                # Their aggregated entries were not posted
+                handled.difference_update(event_id for event_id, r in results if r.posted == "Pending")
+
+        failed = [event_id for event_id, r in results if r.posted == "Failed"]
+        if failed:
+            # POSTs are not retried; leave these meetings to the next run
+            handled.difference_update(failed)
+            if status == 'done':
+                status, error = 'failed', f"{len(failed)} time entries could not be posted"
+        # Shard bounds are UTC, as in fetch_meetings
+        if status == 'done' and datetime.combine(shard.end, datetime.min.time()) > datetime.utcnow():
+            status = 'open'
+
+        if base.task_matcher.prior:
+            with self._lock:
+                base.task_matcher.prior.save()
+        with self._lock:
+            for stage, seconds in worker.stage_times.items():
+                base.stage_times[stage] = base.stage_times.get(stage, 0.0) + seconds
+
+        posted = [r for r in worker.results if r.posted == 'Yes']
+        if worker.aggregate:
+            hours = sum(e['time_entry']['time'] for e in worker.aggregated_entries if e['posted'] == 'Yes')
+        else:
+            hours = sum(r.billable_duration for r in posted)
+        entry = {
+            'status': status,
+            'meetings': len(worker.results),
+            'matched': sum(1 for r in worker.results if r.match_status == 'Matched'),
+            'posted': len(posted),
+            'hours': round(hours, 1)
+        }
+        if status != 'done':
+            entry['handled'] = sorted(handled)
+        if error:
+            entry['error'] = error
+        return entry
+
+    def add_totals(self, entry: Dict[str, Any]):
+        with self._lock:
+            if entry['status'] == 'done':
+                self.totals['shards'] += 1
+            elif entry['status'] == 'failed':
+                self.totals['failed'] += 1
+            for key in ('meetings', 'matched', 'posted', 'hours'):
+                self.totals[key] += entry[key]
+
+    def show_summary(self, wall_seconds: float):
+        totals = self.totals
+        print("\n=== Backfill Report ===")
+        print(f"Shards Completed: {totals['shards']}")
+        if totals['failed']:
+            print(f"Shards Failed: {totals['failed']} (rerun the same command to retry them)")
+        print(f"Meetings Processed: {totals['meetings']}")
+        print(f"Successfully Matched: {totals['matched']}")
+        print(f"Time Entries Posted: {totals['posted']}")
+        print(f"Total Billable Hours: {round(totals['hours'], 1)} hours")
+        usage = self.processor.task_matcher.usage
+        if usage.requests:
+            print(f"AI Matching: {usage.summary()}")
+        self.processor.show_timing(wall_seconds)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Offline check of the sharded backfill: parallel speed-up and resume.
+
+Backfills the fixture meetings (spread over the last 30 days) against the
+stub services, once per worker count. Each run is stopped after about
+half of its entries are posted and then resumed from the checkpoint;
+the resumed run must post the rest without duplicating any entry.
+Entries are compared by date and description, since which of two
+same-day meetings with the same title gets which task can vary.
+
+Usage:
+    python benchmarks/bench_backfill.py [--meetings 1000] [--tasks 200]
+        [--workers 1,4] [--shard day] [--latency-ms 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import generate_fixtures
+from stub_services import StubServices
+from bench_pipeline import offline_clients, quiet
+
+from backfill import Backfill
+from intervals_client import time_entry_key
+from meeting_processor import MeetingProcessor
+
+def entry_keys(entries):
+    return Counter((key[0], key[2]) for key in map(time_entry_key, entries))
+
+def backfill(stub: StubServices, args, workers: int, checkpoint: str, stop_after: int = 0) -> float:
+    """Run one backfill; stop it once stop_after entries are posted (0: never)."""
+    graph, intervals, matcher = offline_clients(stub)
+    processor = MeetingProcessor(graph_client=graph, intervals_client=intervals,
+                                 task_matcher=matcher, use_prior=False)
+    end = date.today()
+    job = Backfill(processor, end - timedelta(days=31), end, shard_size=args.shard,
+                   workers=workers, checkpoint_path=checkpoint)
+
+    def watch_posted():
+        while not job.stopping.is_set() and len(stub.posted_entries) < stop_after:
+            time.sleep(0.001)
+        job.stopping.set()
+
+    if stop_after:
+        threading.Thread(target=watch_posted, daemon=True).start()
+    started = time.perf_counter()
+    with quiet(not args.verbose):
+        job.run()
+    job.stopping.set()
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--meetings", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--workers", default="1,4", help="comma-separated worker counts")
+    parser.add_argument("--shard", choices=("day", "week"), default="day")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated latency per request")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="show backfill output")
+    args = parser.parse_args()
+
+    print(f"{args.meetings} meetings x {args.tasks} tasks, {args.shard} shards, "
+          f"{args.latency_ms:g} ms per request")
+    for workers in (int(w) for w in args.workers.split(',')):
+        fixtures = generate_fixtures(args.meetings, args.tasks, seed=args.seed)
+        with StubServices(fixtures, latency_ms=args.latency_ms) as stub, \
+                tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, "checkpoint.json")
+
+            # A full run on a copy of the fixtures gives the expected entries
+            baseline = generate_fixtures(args.meetings, args.tasks, seed=args.seed)
+            with StubServices(baseline, latency_ms=args.latency_ms) as full:
+                full_seconds = backfill(full, args, workers, os.path.join(directory, "full.json"))
+                expected = entry_keys(full.posted_entries)
+
+            first_seconds = backfill(stub, args, workers, checkpoint, stop_after=expected.total() // 2)
+            first = len(stub.posted_entries)
+            resume_seconds = backfill(stub, args, workers, checkpoint)
+            posted = entry_keys(stub.posted_entries)
+
+        print(f"  {workers} worker(s): full run {full_seconds:6.2f} s, {expected.total()} entries")
+        print(f"    stopped after {first_seconds:5.2f} s with {first} posted, "
+              f"resumed in {resume_seconds:5.2f} s: {posted.total()} posted, "
+              f"{(posted - expected).total()} duplicates, "
+              f"{'complete' if not expected - posted else 'INCOMPLETE'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Offline end-to-end benchmark of the meeting pipeline.
+
+Runs ``TaskMatcher`` and ``MeetingProcessor.run`` against local stand-ins
+for Graph, Intervals and Azure OpenAI (see ``stub_services.py``) using
+synthetic N meetings x M tasks fixtures, and reports wall time, requests
+per run and matcher throughput for each scale.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--scales 100,1000,10000] [--tasks 200]
+        [--latency-ms 0] [--llm-latency-ms 0] [--llm-budget-tokens N]
+        [--fixtures FILE] [--json FILE]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import generate_fixtures, load_fixtures, meeting_subjects, save_fixtures
+from stub_services import StubServices
+
+from graph_client import GraphClient
+from intervals_client import IntervalsClient
+from meeting_processor import MeetingProcessor
+from task_matcher import TaskMatcher
+from task_prior import TaskPrior
+from metrics import metrics
+
+MATCH_STAGES = ('prior', 'direct', 'fuzzy', 'cache', 'llm')
+
+def offline_clients(stub: StubServices, prior: TaskPrior = None):
+    """Graph/Intervals/matcher clients wired to the stub, already authenticated."""
+    graph = GraphClient(base_url=stub.graph_url)
+    graph.access_token = "offline"
+    graph.user_id = stub.fixtures['user']['id']
+    graph.session.headers.update({
+        "Authorization": f"Bearer {graph.access_token}",
+        "Content-Type": "application/json"
+    })
+    intervals = IntervalsClient("offline", base_url=stub.intervals_url)
+    matcher = TaskMatcher(endpoint=stub.openai_url, api_key="offline", prior=prior)
+    return graph, intervals, matcher
+
+@contextlib.contextmanager
+def quiet(enabled: bool = True):
+    """Silence the pipeline's console output while timing it."""
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def bench_matcher(stub: StubServices, sample: int, verbose: bool) -> dict:
+    """Time build_task_context and direct_match in isolation."""
+    _, intervals, matcher = offline_clients(stub)
+    tasks = stub.fixtures['tasks']
+
+    started = time.perf_counter()
+    with quiet(not verbose):
+        matcher.build_task_context(tasks, intervals)
+    context_seconds = time.perf_counter() - started
+
+    subjects = meeting_subjects(stub.fixtures)[:sample]
+    started = time.perf_counter()
+    with quiet(not verbose):
+        hits = sum(1 for subject in subjects if matcher.direct_match(subject, tasks))
+    match_seconds = time.perf_counter() - started
+
+    return {
+        'context_seconds': context_seconds,
+        'direct_match_ops_per_sec': len(subjects) / match_seconds if match_seconds else 0.0,
+        'direct_hit_rate': hits / len(subjects) if subjects else 0.0,
+    }
+
+def bench_pipeline(stub: StubServices, verbose: bool, aggregate: bool = False,
+                   prior: TaskPrior = None, llm_token_budget: int = None) -> dict:
+    """Time a full MeetingProcessor.run against the stub services."""
+    graph, intervals, matcher = offline_clients(stub, prior)
+    processor = MeetingProcessor(graph_client=graph, intervals_client=intervals,
+                                 task_matcher=matcher, aggregate=aggregate,
+                                 llm_token_budget=llm_token_budget)
+
+    stub.reset_counts()
+    metrics.reset()
+    started = time.perf_counter()
+    with quiet(not verbose):
+        processor.run()
+    wall_seconds = time.perf_counter() - started
+
+    meetings = len(processor.results)
+    return {
+        'wall_seconds': wall_seconds,
+        'meetings_per_sec': meetings / wall_seconds if wall_seconds else 0.0,
+        'requests': stub.request_counts(),
+        'posted': len(stub.posted_entries),
+        'stage_seconds': dict(processor.stage_times),
+        'match_hits': {
+            stage: int(metrics.counter_value('match_hits_total', stage=stage))
+            for stage in MATCH_STAGES
+        },
+        'llm': {
+            'requests': matcher.usage.requests,
+            'prompt_tokens': matcher.usage.prompt_tokens,
+            'cached_tokens': matcher.usage.cached_tokens,
+            'completion_tokens': matcher.usage.completion_tokens,
+            'cost_usd': matcher.usage.cost,
+            'skipped': int(metrics.counter_value('llm_skipped_total', reason='budget')),
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="100,1000,10000",
+                        help="comma-separated meeting counts")
+    parser.add_argument("--tasks", type=int, default=200, help="number of tasks")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="latency injected into every Graph/Intervals request")
+    parser.add_argument("--llm-latency-ms", type=float, default=None,
+                        help="latency injected into chat completions (default: --latency-ms)")
+    parser.add_argument("--match-sample", type=int, default=2000,
+                        help="subjects used for the direct_match throughput figure")
+    parser.add_argument("--fixtures", metavar="FILE",
+                        help="replay a recorded fixture file instead of generating data")
+    parser.add_argument("--save-fixtures", metavar="DIR",
+                        help="save the generated fixtures of each scale to DIR")
+    parser.add_argument("--runs", type=int, default=1,
+                        help="pipeline runs per scale; later runs find the earlier entries as duplicates")
+    parser.add_argument("--aggregate", action="store_true",
+                        help="post one entry per task and day")
+    parser.add_argument("--llm-budget-tokens", type=int, default=None,
+                        help="LLM token budget per run")
+    parser.add_argument("--json", metavar="FILE", help="write results as JSON")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="show pipeline output")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        datasets = [load_fixtures(args.fixtures)]
+    else:
+        scales = [int(scale) for scale in args.scales.split(",") if scale]
+        datasets = [generate_fixtures(n, args.tasks, seed=args.seed) for n in scales]
+
+    results = []
+    for fixtures in datasets:
+        n, m = len(fixtures['meetings']), len(fixtures['tasks'])
+        if args.save_fixtures:
+            os.makedirs(args.save_fixtures, exist_ok=True)
+            save_fixtures(fixtures, os.path.join(args.save_fixtures, f"fixtures_{n}x{m}.json"))
+
+        with StubServices(fixtures, args.latency_ms, args.llm_latency_ms) as stub:
+            # In-memory task history shared by the runs of this scale
+            prior = TaskPrior()
+            matcher = bench_matcher(stub, args.match_sample, args.verbose)
+            runs = [bench_pipeline(stub, args.verbose, args.aggregate, prior,
+                                   args.llm_budget_tokens) for _ in range(max(1, args.runs))]
+
+        result = {'meetings': n, 'tasks': m, 'matcher': matcher, 'pipeline': runs[0], 'runs': runs}
+        results.append(result)
+
+        print(f"{n} meetings x {m} tasks")
+        for run_number, pipeline in enumerate(runs, 1):
+            requests = pipeline['requests']
+            if len(runs) > 1:
+                print(f"  run {run_number}")
+            print(f"  end-to-end wall time     {pipeline['wall_seconds']:10.2f} s")
+            print(f"  meetings/sec             {pipeline['meetings_per_sec']:10.1f}")
+            print(f"  requests per run         {requests.get('total', 0):10d} "
+                  f"(graph {requests.get('graph', 0)}, intervals {requests.get('intervals', 0)}, "
+                  f"openai {requests.get('openai', 0)})")
+            print(f"  time entries posted      {pipeline['posted']:10d}")
+            print(f"  match hits by stage      " + ", ".join(
+                f"{stage} {count}" for stage, count in pipeline['match_hits'].items()))
+            llm = pipeline['llm']
+            if llm['requests'] or llm['skipped']:
+                cached_share = llm['cached_tokens'] / llm['prompt_tokens'] if llm['prompt_tokens'] else 0
+                print(f"  llm prompt tokens        {llm['prompt_tokens']:10d} ({cached_share:.0%} cached), "
+                      f"~${llm['cost_usd']:.4f}"
+                      + (f", {llm['skipped']} skipped over budget" if llm['skipped'] else ""))
+        print(f"  build_task_context       {matcher['context_seconds']:10.3f} s")
+        print(f"  direct_match ops/sec     {matcher['direct_match_ops_per_sec']:10.0f} "
+              f"(hit rate {matcher['direct_hit_rate']:.0%})")
+        print()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to: {args.json}")
+
+if __name__ == "__main__":
+    main()
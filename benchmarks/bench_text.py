@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for text normalization and join-URL parsing.
+
+Compares the original per-call ``re.sub``/``re.search`` implementations with
+the precompiled, memoized helpers in ``text_utils``.
+
+Usage:
+    python benchmarks/bench_text.py [--number N]
+"""
+import argparse
+import contextlib
+import io
+import os
+import re
+import sys
+import timeit
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_utils import normalize_text, tokenize, parse_join_url
+from models import TaskContext
+from ngram_index import NgramIndex
+from task_matcher import TaskMatcher
+
+SUBJECTS = [
+    "Daily Status Report",
+    "  Infra   Meeting\r\n- Network upgrade  ",
+    "UMG Weekly Sync 🚀 (Q3 planning)",
+    "WD Task review\twith client",
+    "1:1 Rajesh / Team lead",
+]
+
+JOIN_URL = (
+    "https://teams.microsoft.com/l/meetup-join/"
+    "19%3ameeting_NjQ4ZTk5YjEtMDY2Zi00YTJiLWJkNTQtODJiNDk0YjE0ZDA1%40thread.v2/0"
+    "?context=%7b%22Tid%22%3a%22a5ae9ae1-3c47-4b70-b92c-ac3a0efffc6a%22%2c"
+    "%22Oid%22%3a%2205f0a8c2-6e3b-4f61-9b59-2f1d1b6e7c11%22%7d"
+)
+
+def legacy_clean_text(text, remove_emoji=False):
+    if not text:
+        return "Untitled"
+    if remove_emoji:
+        text = re.sub(r'[^\x00-\x7F]+', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[\r\n]+', ' ', text)
+    text = text.strip()
+    return text if text else "Untitled"
+
+def legacy_tokenize(text):
+    clean_title = legacy_clean_text(text, remove_emoji=True)
+    return [
+        word.lower() for word in clean_title.split()
+        if len(word) > 2 and not word.isdigit()
+    ]
+
+def legacy_parse_join_url(join_url):
+    decoded_url = urllib.parse.unquote(join_url)
+    meeting_id_match = re.search(r"19:meeting_([^@]+)@thread\.v2", decoded_url)
+    meeting_id = f"19:meeting_{meeting_id_match.group(1)}@thread.v2"
+    organizer_match = re.search(r'"Oid":"([^"]+)"', decoded_url)
+    return meeting_id, organizer_match.group(1)
+
+def check_equivalence():
+    """Make sure the fast paths return what the old code did for ASCII and emoji."""
+    for subject in SUBJECTS + ["", "   "]:
+        for remove_emoji in (False, True):
+            assert normalize_text(subject, remove_emoji) == legacy_clean_text(subject, remove_emoji), subject
+        assert list(tokenize(subject)) == legacy_tokenize(subject), subject
+    # Accented letters are folded to ASCII instead of dropped
+    assert normalize_text(" Café Société ", True) == "Cafe Societe"
+    assert tuple(parse_join_url(JOIN_URL)) == legacy_parse_join_url(JOIN_URL)
+
+# Fuzzy matching regression cases: subject -> task ID (None: left to the LLM)
+FUZZY_TASKS = {
+    '1': ("Infrastructure Maintenance", "Internal"),
+    '2': ("Kubernetes Cluster Upgrade", "Platform"),
+    '3': ("Monthly Reporting", "Société Générale"),
+    '4': ("Client Onboarding", "Acme"),
+    '5': ("Team Meeting", "Internal"),
+}
+FUZZY_CASES = [
+    ("Infra maintenance sync", '1'),
+    ("Infrastructre maintenance review", '1'),
+    ("K8s", '2'),
+    ("K8s upgrade call", '2'),
+    ("Societe Generale sync", '3'),
+    ("Société Génerale monthly", '3'),
+    ("Lunch with Acme", None),
+    # Half the title recognised, or one word only resembling a keyword:
+    # left to the LLM
+    ("Infra sync", None),
+    ("Client lunch", None),
+    ("Meeting notes", None),
+    ("Internet outage", None),
+    ("Internet", None),
+]
+
+def check_fuzzy_examples():
+    """Typos, abbreviations and accented names reach their task without the LLM."""
+    matcher = TaskMatcher(api_key="offline")
+    for task_id, (title, project) in FUZZY_TASKS.items():
+        title_words = tokenize(title)
+        matcher.task_context[task_id] = TaskContext(
+            task_id=task_id, title_words=title_words, project_name=project,
+            keywords=frozenset(title_words + tokenize(project))
+        )
+    matcher.fuzzy_index = NgramIndex.build({
+        task_id: context.keywords for task_id, context in matcher.task_context.items()
+    })
+    tasks = [{'id': task_id} for task_id in FUZZY_TASKS]
+    for subject, expected in FUZZY_CASES:
+        with contextlib.redirect_stdout(io.StringIO()):
+            found = matcher.fuzzy_match(subject, tasks)
+        assert found == expected, f"{subject!r}: {found!r} instead of {expected!r}"
+
+def bench(label, func, number):
+    seconds = timeit.timeit(func, number=number)
+    per_call = seconds / number * 1e6
+    print(f"  {label:<32} {per_call:8.3f} us/call")
+    return per_call
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="iterations per case")
+    args = parser.parse_args()
+
+    check_equivalence()
+    check_fuzzy_examples()
+
+    cases = [
+        ("clean_text(remove_emoji=True)",
+         lambda: [legacy_clean_text(s, True) for s in SUBJECTS],
+         lambda: [normalize_text(s, True) for s in SUBJECTS]),
+        ("tokenize",
+         lambda: [legacy_tokenize(s) for s in SUBJECTS],
+         lambda: [tokenize(s) for s in SUBJECTS]),
+        ("parse_join_url",
+         lambda: legacy_parse_join_url(JOIN_URL),
+         lambda: parse_join_url(JOIN_URL)),
+    ]
+
+    for name, legacy, current in cases:
+        print(name)
+        before = bench("legacy", legacy, args.number)
+        after = bench("text_utils", current, args.number)
+        print(f"  {'speedup':<32} {before / after:8.1f}x\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Offline check of watch mode: notification-to-posted latency.
+
+Starts ``MeetingWatcher`` against the stub services, then publishes
+meetings as they end. Their attendance reports appear after a delay, and
+one in every ``--missed-every`` meetings is published without a change
+notification so only the delta sync can find it. Reports how long each
+meeting took to be posted and how many requests that cost.
+
+Usage:
+    python benchmarks/bench_watch.py [--meetings 20] [--tasks 200]
+        [--report-delay 0.5] [--retry 0.2] [--delta-interval 2] [--missed-every 5]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixtures import generate_fixtures, live_meeting
+from stub_services import StubServices
+from bench_pipeline import offline_clients, quiet
+
+from meeting_processor import MeetingProcessor
+from watcher import MeetingWatcher
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--meetings", type=int, default=20, help="meetings published while watching")
+    parser.add_argument("--tasks", type=int, default=200, help="number of tasks")
+    parser.add_argument("--interval", type=float, default=0.2,
+                        help="seconds between meetings ending")
+    parser.add_argument("--report-delay", type=float, default=0.5,
+                        help="seconds after a meeting ends until its attendance report exists")
+    parser.add_argument("--retry", type=float, default=0.2,
+                        help="seconds between attendance report checks")
+    parser.add_argument("--delta-interval", type=float, default=2.0,
+                        help="seconds between delta syncs")
+    parser.add_argument("--missed-every", type=int, default=5,
+                        help="publish every Nth meeting without a notification (0: never)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="show watcher output")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    fixtures = generate_fixtures(0, args.tasks, seed=args.seed)
+
+    with StubServices(fixtures) as stub:
+        graph, intervals, matcher = offline_clients(stub)
+        processor = MeetingProcessor(graph_client=graph, intervals_client=intervals,
+                                     task_matcher=matcher, use_prior=False)
+        watcher = MeetingWatcher(
+            processor, listen=("127.0.0.1", 0),
+            delta_interval=timedelta(seconds=args.delta_interval),
+            attendance_delay=timedelta(0),
+            attendance_retry=timedelta(seconds=args.retry)
+        )
+
+        def watch():
+            with quiet(not args.verbose):
+                watcher.run()
+
+        thread = threading.Thread(target=watch, daemon=True)
+        thread.start()
+        while watcher.next_delta is None and thread.is_alive():
+            time.sleep(0.01)
+        stub.reset_counts()
+
+        ended = {}  # Subject -> (time the meeting ended, notified)
+        reports = []  # (due, online meeting ID, report)
+        posted = {}  # Subject -> time its entry was posted
+        deadline = time.perf_counter() + args.timeout
+        next_meeting = time.perf_counter()
+        index = 0
+        while len(posted) < args.meetings and time.perf_counter() < deadline:
+            now = time.perf_counter()
+            if index < args.meetings and now >= next_meeting:
+                end = datetime.utcnow()
+                event, online_id, report = live_meeting(fixtures, index, end - timedelta(minutes=30),
+                                                        timedelta(minutes=30), rng)
+                notify = not (args.missed_every and (index + 1) % args.missed_every == 0)
+                ended[event['subject']] = (now, notify)
+                reports.append((now + args.report_delay, online_id, report))
+                stub.publish_event(event, notify=notify)
+                index += 1
+                next_meeting = now + args.interval
+
+            for due, online_id, report in [r for r in reports if r[0] <= now]:
+                stub.add_attendance_report(online_id, report)
+                reports.remove((due, online_id, report))
+
+            for entry in stub.posted_entries:
+                subject = entry['description'].split(" (Actual attendance", 1)[0]
+                if subject in ended and subject not in posted:
+                    posted[subject] = now
+            time.sleep(0.005)
+
+        watcher.stop()
+        thread.join(timeout=10)
+        counts = stub.request_counts()
+
+    notified = [posted[s] - ended[s][0] for s in posted if ended[s][1]]
+    missed = [posted[s] - ended[s][0] for s in posted if not ended[s][1]]
+    print(f"{args.meetings} meetings x {args.tasks} tasks "
+          f"(report delay {args.report_delay:g} s, delta sync every {args.delta_interval:g} s)")
+    print(f"  posted                   {len(posted):10d} of {args.meetings}")
+    print(f"  end -> posted, notified  p50 {percentile(notified, 0.5):6.2f} s   "
+          f"max {max(notified, default=0):6.2f} s")
+    if missed:
+        print(f"  end -> posted, missed    p50 {percentile(missed, 0.5):6.2f} s   "
+              f"max {max(missed, default=0):6.2f} s  (delta sync only)")
+    print(f"  requests                 {counts.get('total', 0):10d} "
+          f"(graph {counts.get('graph', 0)}, intervals {counts.get('intervals', 0)}, "
+          f"openai {counts.get('openai', 0)})")
+    if posted:
+        print(f"  requests per meeting     {counts.get('total', 0) / len(posted):10.1f}")
+
+if __name__ == "__main__":
+    main()
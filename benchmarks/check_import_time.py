@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Startup regression check based on ``python -X importtime``.
+
+Fails (exit status 1) when importing ``main`` exceeds the time budget, or
+when the pipeline modules pull in dependencies that must stay lazy.
+
+Usage:
+    python benchmarks/check_import_time.py [--budget-ms 50] [--runs 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported when a command actually needs them
+LAZY_MODULES = ("msal", "pandas", "pyarrow")
+
+def import_profile(module: str) -> dict:
+    """Return {module: cumulative microseconds} for a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [part.strip() for part in line[len("import time:"):].split("|")]
+        if not parts[1].isdigit():
+            continue
+        timings[parts[2].strip()] = int(parts[1])
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=50.0,
+                        help="maximum cumulative import time of main")
+    parser.add_argument("--runs", type=int, default=5,
+                        help="number of samples; the fastest one is compared")
+    args = parser.parse_args()
+
+    failures = []
+
+    samples = [import_profile("main").get("main", 0) / 1000 for _ in range(args.runs)]
+    best = min(samples)
+    print(f"import main: {best:.1f} ms (budget {args.budget_ms:.1f} ms)")
+    if best > args.budget_ms:
+        failures.append(f"import main took {best:.1f} ms, over the {args.budget_ms:.1f} ms budget")
+
+    for module in ("main", "meeting_processor"):
+        try:
+            loaded = import_profile(module)
+        except RuntimeError as e:
+            # Missing third-party packages are an environment problem, not a regression
+            print(f"Skipping lazy-import check for {module}: {str(e).splitlines()[-1]}")
+            continue
+        eager = sorted(name for name in loaded if name.split(".")[0] in LAZY_MODULES)
+        if eager:
+            failures.append(f"import {module} eagerly loads: {', '.join(eager)}")
+        else:
+            print(f"import {module}: no eager {', '.join(LAZY_MODULES)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
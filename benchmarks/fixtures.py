@@ -0,0 +1,221 @@
+"""Synthetic Graph / Intervals fixtures for offline benchmarks.
+
+``generate_fixtures`` builds N meetings and M tasks with a realistic mix of
+subjects: titles that hit ``direct_match``, noisy ones that fall through to
+the LLM, recurring series that share a Teams join URL, and offline meetings.
+Fixtures can be saved to and loaded from JSON so that a run can be replayed
+against exactly the same data.
+"""
+import base64
+import json
+import random
+import urllib.parse
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+TENANT_ID = "00000000-0000-0000-0000-000000000001"
+
+VOCABULARY = [
+    "infrastructure", "network", "daily", "status", "report", "client",
+    "review", "planning", "sprint", "security", "migration", "database",
+    "support", "billing", "onboarding", "release", "design", "backend",
+    "frontend", "mobile", "analytics", "compliance", "audit", "payroll",
+    "marketing", "campaign", "vendor", "contract", "training", "hiring",
+    "backup", "monitoring", "firewall", "storage", "cloud", "licensing",
+    "helpdesk", "rollout", "integration", "testing", "quality", "roadmap",
+]
+
+CLIENTS = [
+    "Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark", "Wayne",
+    "Wonka", "Tyrell", "Cyberdyne", "Soylent", "Massive", "Vandelay",
+]
+
+FILLER = ["sync", "call", "catch", "chat", "discussion", "touchpoint", "huddle", "weekly"]
+
+def _thread_id(rng: random.Random) -> str:
+    raw = rng.getrandbits(216).to_bytes(27, 'big')
+    return base64.b64encode(raw).decode().replace('+', 'A').replace('/', 'B')
+
+def build_join_url(thread_meeting_id: str, organizer_oid: str) -> str:
+    """Build a Teams join URL the way Graph returns it."""
+    context = json.dumps({"Tid": TENANT_ID, "Oid": organizer_oid}, separators=(',', ':'))
+    return (
+        "https://teams.microsoft.com/l/meetup-join/"
+        f"{urllib.parse.quote(f'19:meeting_{thread_meeting_id}@thread.v2')}/0"
+        f"?context={urllib.parse.quote(context)}"
+    )
+
+def online_meeting_id(thread_meeting_id: str, organizer_oid: str) -> str:
+    """The base64 onlineMeeting ID that GraphClient derives from a join URL."""
+    raw = f"1*{organizer_oid}*0**19:meeting_{thread_meeting_id}@thread.v2"
+    return base64.b64encode(raw.encode('utf-8')).decode('utf-8')
+
+def _graph_time(dt: datetime) -> str:
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.0000000')
+
+def generate_fixtures(meeting_count: int, task_count: int, seed: int = 42,
+                      online_ratio: float = 0.7, recurring_ratio: float = 0.3) -> Dict[str, Any]:
+    """Generate a deterministic fixture set of meeting_count x task_count."""
+    rng = random.Random(seed)
+
+    user_id = "11111111-2222-3333-4444-555555555555"
+    fixtures = {
+        'user': {
+            'id': user_id,
+            'displayName': "Bench User",
+            'userPrincipalName': "bench.user@example.com",
+        },
+        'person': {
+            'id': "900001",
+            'personid': "900001",
+            'firstname': "Bench",
+            'lastname': "User",
+            'username': "bench.user",
+        },
+        'projects': {},
+        'tasks': [],
+        'meetings': [],  # Calendar instances: single instances and series occurrences
+        'attendance': {},
+        'time_entries': [],
+    }
+
+    project_count = max(1, task_count // 5)
+    for i in range(project_count):
+        project_id = str(300000 + i)
+        name = f"{CLIENTS[i % len(CLIENTS)]} {rng.choice(VOCABULARY).title()}"
+        fixtures['projects'][project_id] = {'id': project_id, 'name': name}
+
+    for i in range(task_count):
+        project_id = str(300000 + i % project_count)
+        words = rng.sample(VOCABULARY, 2)
+        fixtures['tasks'].append({
+            'id': str(100000 + i),
+            'title': f"{words[0].title()} {words[1].title()} Task {i}",
+            'projectid': project_id,
+            'moduleid': str(500000 + i % 7),
+        })
+
+    # Meetings end before today so they all fall inside the default 30-day window
+    end = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    series = []
+    for i in range(meeting_count):
+        task = rng.choice(fixtures['tasks'])
+        title_words = task['title'].split()[:2]
+        kind = rng.random()
+        if kind < 0.6:
+            subject = " ".join(title_words)
+        elif kind < 0.85:
+            subject = f"{title_words[rng.randrange(2)]} {rng.choice(FILLER)} {rng.choice(CLIENTS)}"
+        else:
+            subject = f"{rng.choice(FILLER).title()} with {rng.choice(CLIENTS)}"
+
+        start = end - timedelta(days=rng.randrange(30), hours=6 + rng.randrange(9), minutes=rng.choice([0, 15, 30]))
+        duration = timedelta(minutes=rng.choice([15, 30, 30, 45, 60, 90]))
+        meeting = {
+            'id': f"AAMk{i:08d}",
+            'subject': subject,
+            'bodyPreview': "" if rng.random() < 0.5 else f"Agenda for {subject}",
+            'start': {'dateTime': _graph_time(start), 'timeZone': 'UTC'},
+            'end': {'dateTime': _graph_time(start + duration), 'timeZone': 'UTC'},
+            'organizer': {'emailAddress': {'name': "Organizer", 'address': f"owner{i % 17}@example.com"}},
+            'type': 'singleInstance',
+            'seriesMasterId': None,
+            'onlineMeeting': None,
+        }
+
+        if rng.random() < online_ratio:
+            if series and rng.random() < recurring_ratio:
+                # Another occurrence of an existing recurring series
+                series_master_id, thread_id, organizer_oid, series_subject = rng.choice(series)
+                meeting['subject'] = series_subject
+                meeting['type'] = 'occurrence'
+                meeting['seriesMasterId'] = series_master_id
+            else:
+                thread_id = _thread_id(rng)
+                organizer_oid = str(uuid.UUID(int=rng.getrandbits(128)))
+                if rng.random() < recurring_ratio:
+                    series_master_id = f"AAMkSeries{len(series):06d}"
+                    series.append((series_master_id, thread_id, organizer_oid, subject))
+                    meeting['type'] = 'occurrence'
+                    meeting['seriesMasterId'] = series_master_id
+
+            meeting['onlineMeeting'] = {'joinUrl': build_join_url(thread_id, organizer_oid)}
+
+            records = []
+            for a in range(rng.randint(1, 6)):
+                attended = int(duration.total_seconds() * rng.uniform(0.3, 1.0))
+                records.append({
+                    'id': f"rec-{i}-{a}",
+                    'emailAddress': f"attendee{a}@example.com",
+                    'totalAttendanceInSeconds': attended,
+                    'role': 'Organizer' if a == 0 else 'Attendee',
+                    'identity': {'id': f"id-{a}", 'displayName': f"Attendee {a}"},
+                })
+            fixtures['attendance'].setdefault(online_meeting_id(thread_id, organizer_oid), []).append({
+                'id': f"report-{i}",
+                'totalParticipantCount': len(records),
+                'meetingStartDateTime': start.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+                'meetingEndDateTime': (start + duration).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+                'attendanceRecords': records,
+            })
+
+        fixtures['meetings'].append(meeting)
+
+    return fixtures
+
+def save_fixtures(fixtures: Dict[str, Any], path: str) -> None:
+    """Write a fixture set to a JSON file."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(fixtures, f)
+
+def load_fixtures(path: str) -> Dict[str, Any]:
+    """Load a fixture set written by save_fixtures (or recorded by hand)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        fixtures = json.load(f)
+    fixtures.setdefault('attendance', {})
+    fixtures.setdefault('time_entries', [])
+    return fixtures
+
+def meeting_subjects(fixtures: Dict[str, Any]) -> List[str]:
+    """All meeting subjects in fixture order."""
+    return [meeting['subject'] for meeting in fixtures['meetings']]
+
+def live_meeting(fixtures: Dict[str, Any], index: int, start: datetime, duration: timedelta,
+                 rng: random.Random) -> Tuple[Dict[str, Any], str, Dict[str, Any]]:
+    """A new online meeting for watch-mode runs.
+
+    Returns (event, onlineMeeting ID, attendance report); the report is not
+    added to the fixtures, so callers decide when it becomes available.
+    """
+    task = rng.choice(fixtures['tasks'])
+    subject = f"{' '.join(task['title'].split()[:2])} #{index}"
+    thread_id = _thread_id(rng)
+    organizer_oid = str(uuid.UUID(int=rng.getrandbits(128)))
+    event = {
+        'id': f"AAMkLive{index:08d}",
+        'subject': subject,
+        'bodyPreview': "",
+        'start': {'dateTime': _graph_time(start), 'timeZone': 'UTC'},
+        'end': {'dateTime': _graph_time(start + duration), 'timeZone': 'UTC'},
+        'organizer': {'emailAddress': {'name': "Organizer", 'address': "owner@example.com"}},
+        'type': 'singleInstance',
+        'seriesMasterId': None,
+        'isCancelled': False,
+        'onlineMeeting': {'joinUrl': build_join_url(thread_id, organizer_oid)},
+    }
+    attended = int(duration.total_seconds() * rng.uniform(0.5, 1.0))
+    report = {
+        'id': f"report-live-{index}",
+        'totalParticipantCount': 1,
+        'meetingStartDateTime': start.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+        'meetingEndDateTime': (start + duration).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+        'attendanceRecords': [{
+            'id': f"rec-live-{index}",
+            'emailAddress': "attendee0@example.com",
+            'totalAttendanceInSeconds': attended,
+            'role': 'Organizer',
+            'identity': {'id': "id-0", 'displayName': "Attendee 0"},
+        }],
+    }
+    return event, online_meeting_id(thread_id, organizer_oid), report
@@ -0,0 +1,455 @@
+"""Local stand-ins for Microsoft Graph, Intervals and Azure OpenAI.
+
+A single threaded HTTP server answers the endpoints the pipeline uses from a
+fixture set (see ``fixtures.py``), with optional injected latency, and
+counts every request so benchmarks can report requests per run.
+
+Fixture meetings are calendar instances. As in Graph, ``calendarView``
+returns them with recurring meetings expanded into occurrences, while
+``/events`` lists single instances and one series master per series.
+
+    with StubServices(fixtures, latency_ms=20) as stub:
+        graph = GraphClient(base_url=stub.graph_url)
+        ...
+        print(stub.request_counts())
+
+Calendar changes for watch mode are simulated with ``publish_event``: the
+event is stored, shows up in ``calendarView/delta`` and, like Graph, is
+announced to every subscription's notification URL.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+GRAPH_PREFIX = "/graph/v1.0"
+INTERVALS_PREFIX = "/intervals"
+OPENAI_PATH = "/openai/chat/completions"
+
+ATTENDANCE_RE = re.compile(
+    r"^/users/[^/]+/onlineMeetings/(.+?)/attendanceReports(?:/([^/]+)/attendanceRecords)?$"
+)
+EVENT_RE = re.compile(r"^/users/[^/]+/events/([^/]+)$")
+SUBSCRIPTION_RE = re.compile(r"^/subscriptions(?:/([^/]+))?$")
+# Prompt caching as Azure OpenAI does it: prompts of at least 1024 tokens,
+# cached prefixes counted in blocks of 128 tokens (about 4 characters each)
+CACHE_MIN_TOKENS = 1024
+CACHE_BLOCK_TOKENS = 128
+FILTER_RE = re.compile(r"(start|end)/dateTime (ge|gt|le|lt) '([^']+)'")
+FILTER_OPS = {
+    'ge': lambda a, b: a >= b, 'gt': lambda a, b: a > b,
+    'le': lambda a, b: a <= b, 'lt': lambda a, b: a < b,
+}
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; avoid the Nagle/delayed-ACK stall
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: Any):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _dispatch(self, method: str):
+        parsed = urllib.parse.urlsplit(self.path)
+        path = parsed.path
+        query = urllib.parse.parse_qs(parsed.query)
+        stub = self.server.stub
+
+        if path.startswith(GRAPH_PREFIX):
+            service, route = 'graph', path[len(GRAPH_PREFIX):]
+        elif path.startswith(INTERVALS_PREFIX):
+            service, route = 'intervals', path[len(INTERVALS_PREFIX):]
+        elif path == OPENAI_PATH:
+            service, route = 'openai', ''
+        else:
+            self._send(404, {'error': 'unknown service'})
+            return
+
+        stub.sleep(service)
+        status, payload, endpoint = getattr(stub, f"handle_{service}")(method, route, query, self)
+        stub.count(service, method, endpoint)
+        self._send(status, payload)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+class StubServices:
+    """Serve a fixture set over HTTP on 127.0.0.1."""
+
+    def __init__(self, fixtures: Dict[str, Any], latency_ms: float = 0.0,
+                 llm_latency_ms: Optional[float] = None, port: int = 0):
+        self.fixtures = fixtures
+        self.latency = latency_ms / 1000
+        self.llm_latency = (latency_ms if llm_latency_ms is None else llm_latency_ms) / 1000
+        self.counts = Counter()
+        self.posted_entries = []
+        self.subscriptions = {}  # Subscription ID -> subscription
+        self.changes = []  # Event IDs in the order they changed
+        self.delta_tokens = {}  # Delta token -> (position in changes, window)
+        self.prompt_prefixes = set()  # Digests of prompt prefixes seen, per 128-token block
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def graph_url(self) -> str:
+        return f"{self.base_url}{GRAPH_PREFIX}"
+
+    @property
+    def intervals_url(self) -> str:
+        return f"{self.base_url}{INTERVALS_PREFIX}"
+
+    @property
+    def openai_url(self) -> str:
+        return f"{self.base_url}{OPENAI_PATH}"
+
+    def start(self) -> "StubServices":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubServices":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def sleep(self, service: str):
+        delay = self.llm_latency if service == 'openai' else self.latency
+        if delay > 0:
+            time.sleep(delay)
+
+    def count(self, service: str, method: str, endpoint: str):
+        with self._lock:
+            self.counts[(service, method, endpoint)] += 1
+
+    def reset_counts(self):
+        with self._lock:
+            self.counts.clear()
+            self.posted_entries = []
+
+    def request_counts(self) -> Dict[str, int]:
+        """Requests per service, plus the total."""
+        totals = Counter()
+        with self._lock:
+            for (service, _, _), count in self.counts.items():
+                totals[service] += count
+        totals['total'] = sum(totals.values())
+        return dict(totals)
+
+    # Calendar changes (watch mode)
+
+    def publish_event(self, event: Dict[str, Any], notify: bool = True,
+                      change_type: str = 'created'):
+        """Add or replace a calendar event and announce the change.
+
+        notify=False leaves the change to be found by a delta sync only,
+        as with a notification Graph failed to deliver.
+        """
+        with self._lock:
+            meetings = self.fixtures['meetings']
+            index = next((i for i, m in enumerate(meetings) if m['id'] == event['id']), None)
+            if index is None:
+                meetings.append(event)
+            else:
+                meetings[index] = event
+            self.changes.append(event['id'])
+            subscriptions = list(self.subscriptions.values())
+
+        if not notify:
+            return
+        for subscription in subscriptions:
+            payload = {'value': [{
+                'subscriptionId': subscription['id'],
+                'clientState': subscription.get('clientState'),
+                'changeType': change_type,
+                'resource': f"Users/{self.fixtures['user']['id']}/Events/{event['id']}",
+                'resourceData': {'@odata.type': '#Microsoft.Graph.Event', 'id': event['id']},
+            }]}
+            self._post(subscription['notificationUrl'], json.dumps(payload).encode('utf-8'))
+
+    def add_attendance_report(self, online_meeting_id: str, report: Dict[str, Any]):
+        """Make an attendance report available, as Graph does after a meeting ends."""
+        with self._lock:
+            self.fixtures['attendance'].setdefault(online_meeting_id, []).append(report)
+
+    @staticmethod
+    def _post(url: str, body: bytes) -> Optional[str]:
+        """POST to a notification URL; the response text, or None on failure."""
+        request = urllib.request.Request(
+            url, data=body, headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.read().decode('utf-8')
+        except OSError:
+            return None
+
+    def _create_subscription(self, body: Dict[str, Any]) -> Tuple[int, Any]:
+        # Validate the notification URL the way Graph does
+        token = uuid.uuid4().hex
+        url = body.get('notificationUrl', '')
+        separator = '&' if '?' in url else '?'
+        if self._post(f"{url}{separator}validationToken={token}", b'') != token:
+            return 400, {'error': {'code': 'ValidationError',
+                                   'message': 'Subscription validation request failed.'}}
+
+        subscription = dict(body, id=str(uuid.uuid4()))
+        with self._lock:
+            self.subscriptions[subscription['id']] = subscription
+        return 201, subscription
+
+    def _calendar_delta(self, query) -> Dict[str, Any]:
+        token = (query.get('$deltatoken') or [None])[0]
+        with self._lock:
+            if token in self.delta_tokens:
+                position, window = self.delta_tokens[token]
+                changed = set(self.changes[position:])
+                events = [m for m in self.fixtures['meetings'] if m['id'] in changed]
+            else:
+                window = ((query.get('startDateTime') or ['0000'])[0].rstrip('Z'),
+                          (query.get('endDateTime') or ['9999'])[0].rstrip('Z'))
+                events = list(self.fixtures['meetings'])
+            events = [
+                m for m in events
+                if m['end']['dateTime'] >= window[0] and m['start']['dateTime'] <= window[1]
+            ]
+            new_token = uuid.uuid4().hex
+            self.delta_tokens[new_token] = (len(self.changes), window)
+        delta_link = (f"{self.graph_url}/users/{self.fixtures['user']['id']}"
+                      f"/calendarView/delta?$deltatoken={new_token}")
+        return {'value': events, '@odata.deltaLink': delta_link}
+
+    def _series_master(self, series_id: str) -> Optional[Dict[str, Any]]:
+        """The series master of a recurring series, as Graph returns it.
+
+        Like Graph, it carries the start and end of the first occurrence.
+        """
+        occurrences = [m for m in self.fixtures['meetings'] if m.get('seriesMasterId') == series_id]
+        if not occurrences:
+            return None
+        first = min(occurrences, key=lambda m: m['start']['dateTime'])
+        return dict(first, id=series_id, type='seriesMaster', seriesMasterId=None)
+
+    def _list_events(self, route: str, query) -> Dict[str, Any]:
+        """/events: single instances and series masters, not occurrences.
+
+        $filter date conditions apply; pages by $top/$skip.
+        """
+        conditions = FILTER_RE.findall((query.get('$filter') or [''])[0])
+        with self._lock:
+            events = [m for m in self.fixtures['meetings'] if not m.get('seriesMasterId')]
+            series_ids = dict.fromkeys(
+                m['seriesMasterId'] for m in self.fixtures['meetings'] if m.get('seriesMasterId')
+            )
+            events.extend(self._series_master(series_id) for series_id in series_ids)
+        events = [
+            m for m in events
+            # Fixture times have 7 fractional digits; compare to the second
+            if all(FILTER_OPS[op](m[field]['dateTime'][:19], value.rstrip('Z')[:19])
+                   for field, op, value in conditions)
+        ]
+        return self._page(route, query, events)
+
+    def _calendar_view(self, route: str, query) -> Dict[str, Any]:
+        """/calendarView: single instances and occurrences overlapping the window."""
+        window = ((query.get('startDateTime') or ['0000'])[0].rstrip('Z')[:19],
+                  (query.get('endDateTime') or ['9999'])[0].rstrip('Z')[:19])
+        with self._lock:
+            events = [
+                m for m in self.fixtures['meetings']
+                if m['end']['dateTime'][:19] > window[0] and m['start']['dateTime'][:19] < window[1]
+            ]
+        events.sort(key=lambda m: m['start']['dateTime'])
+        return self._page(route, query, events)
+
+    def _page(self, route: str, query, events) -> Dict[str, Any]:
+        """One page of events by $top/$skip, with a nextLink when more follow."""
+        if '$top' not in query:
+            return {'value': events}
+
+        top = int(query['$top'][0])
+        skip = int((query.get('$skip') or ['0'])[0])
+        page = {'value': events[skip:skip + top]}
+        if skip + top < len(events):
+            params = {k: v[0] for k, v in query.items()}
+            params['$skip'] = str(skip + top)
+            page['@odata.nextLink'] = f"{self.graph_url}{route}?{urllib.parse.urlencode(params)}"
+        return page
+
+    # Microsoft Graph
+
+    def handle_graph(self, method: str, route: str, query, handler) -> Tuple[int, Any, str]:
+        fixtures = self.fixtures
+        if route == "/me":
+            return 200, fixtures['user'], "/me"
+        if route.endswith("/events"):
+            return 200, self._list_events(route, query), "/users/{id}/events"
+        if route.endswith("/calendarView"):
+            return 200, self._calendar_view(route, query), "/users/{id}/calendarView"
+        if route.endswith("/calendarView/delta"):
+            return 200, self._calendar_delta(query), "/users/{id}/calendarView/delta"
+
+        match = EVENT_RE.match(route)
+        if match:
+            event = next((m for m in fixtures['meetings'] if m['id'] == match.group(1)), None)
+            if event is None:
+                with self._lock:
+                    event = self._series_master(match.group(1))
+            if event is None:
+                return 404, {'error': {'code': 'ErrorItemNotFound'}}, "/users/{id}/events/{id}"
+            return 200, event, "/users/{id}/events/{id}"
+
+        match = SUBSCRIPTION_RE.match(route)
+        if match:
+            if method == "POST":
+                status, payload = self._create_subscription(handler._read_json())
+                return status, payload, "/subscriptions"
+            body = handler._read_json() if method == "PATCH" else {}
+            with self._lock:
+                subscription = self.subscriptions.get(match.group(1))
+                if subscription is None:
+                    return 404, {'error': {'code': 'ResourceNotFound'}}, "/subscriptions/{id}"
+                if method == "DELETE":
+                    del self.subscriptions[match.group(1)]
+                    return 204, None, "/subscriptions/{id}"
+                subscription.update(body)
+                return 200, subscription, "/subscriptions/{id}"
+
+        match = ATTENDANCE_RE.match(route)
+        if match:
+            reports = fixtures['attendance'].get(match.group(1))
+            if reports is None:
+                return 404, {'error': {'code': 'NotFound'}}, "/attendanceReports"
+            if match.group(2):
+                report = next((r for r in reports if r['id'] == match.group(2)), None)
+                if report is None:
+                    return 404, {'error': {'code': 'NotFound'}}, "/attendanceRecords"
+                return 200, {'value': report['attendanceRecords']}, "/attendanceRecords"
+
+            expand = 'attendanceRecords' in (query.get('$expand') or [''])[0]
+            value = [
+                report if expand else {k: v for k, v in report.items() if k != 'attendanceRecords'}
+                for report in reports
+            ]
+            return 200, {'value': value}, "/attendanceReports"
+
+        return 404, {'error': {'code': 'NotFound'}}, route
+
+    # Intervals
+
+    def handle_intervals(self, method: str, route: str, query, handler) -> Tuple[int, Any, str]:
+        fixtures = self.fixtures
+        if route == "/me":
+            return 200, {'me': [fixtures['person']]}, "/me"
+        if route.rstrip('/') == "/task":
+            return 200, {'task': fixtures['tasks']}, "/task"
+        if route.startswith("/project/"):
+            project = fixtures['projects'].get(route.rsplit('/', 1)[-1])
+            return 200, {'project': [project] if project else []}, "/project/{id}"
+        if route.rstrip('/') == "/time" and method == "POST":
+            entry = handler._read_json()
+            with self._lock:
+                entry = dict(entry, id=str(len(fixtures['time_entries']) + 1))
+                self.posted_entries.append(entry)
+                # Later reads (and later runs) see the entry, like the real service
+                fixtures['time_entries'].append(entry)
+            return 201, {'time': entry}, "/time"
+        if route.rstrip('/') == "/time":
+            def param(name, default=''):
+                return (query.get(name) or [default])[0]
+
+            with self._lock:
+                entries = [
+                    e for e in fixtures['time_entries']
+                    if (not param('personid') or str(e.get('personid')) == param('personid'))
+                    and param('datebegin', '0000') <= e.get('date', '') <= param('dateend', '9999')
+                ]
+            offset, limit = int(param('offset', '0')), int(param('limit', '10'))
+            return 200, {'listcount': len(entries), 'time': entries[offset:offset + limit]}, "/time"
+        return 404, {'error': 'not found'}, route
+
+    # Azure OpenAI chat completions
+
+    def cached_prompt_tokens(self, prompt: str) -> int:
+        """Tokens of the longest prefix shared with an earlier prompt, then remember this one."""
+        if len(prompt) // 4 < CACHE_MIN_TOKENS:
+            return 0
+        block = CACHE_BLOCK_TOKENS * 4
+        digest = hashlib.sha1()
+        prefixes = []
+        for end in range(block, len(prompt) + 1, block):
+            digest.update(prompt[end - block:end].encode('utf-8'))
+            prefixes.append(digest.hexdigest())
+        with self._lock:
+            cached = 0
+            for blocks, prefix in enumerate(prefixes, 1):
+                if prefix not in self.prompt_prefixes:
+                    break
+                cached = blocks * CACHE_BLOCK_TOKENS
+            self.prompt_prefixes.update(prefixes)
+        return cached if cached >= CACHE_MIN_TOKENS else 0
+
+    def handle_openai(self, method: str, route: str, query, handler) -> Tuple[int, Any, str]:
+        body = handler._read_json()
+        messages = body.get('messages') or [{}]
+        prompt = "\n".join(m.get('content', '') for m in messages)
+
+        # Deterministic answer derived from the prompt: most pick a task, some do not match
+        digest = int(hashlib.sha1(prompt.encode('utf-8')).hexdigest(), 16)
+        tasks = self.fixtures['tasks']
+        if digest % 5 == 0 or not tasks:
+            answer = {'taskId': 'NO_MATCH', 'confidence': 'low'}
+        else:
+            answer = {'taskId': tasks[digest % len(tasks)]['id'], 'confidence': 'medium'}
+
+        prompt_tokens = max(1, len(prompt) // 4)
+        cached_tokens = self.cached_prompt_tokens(prompt)
+        return 200, {
+            'choices': [{'message': {'role': 'assistant', 'content': json.dumps(answer)}}],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': 20,
+                'total_tokens': prompt_tokens + 20,
+                'prompt_tokens_details': {'cached_tokens': cached_tokens},
+            },
+        }, "/chat/completions"
@@ -6,6 +6,14 @@ CLIENT_ID = "9ec41cd0-ae8c-4dd5-bc84-a3aeea4bda54"
 AZURE_OPENAI_KEY = "CWDspACTbjoETrgOOAi7i2cGXJiHRrFEg6ZciiqxXdy3u9aIWcuSJQQJ99ALACYeBjFXJ3w3AAABACOGQTIv"
 AZURE_OPENAI_ENDPOINT = "https://rajesh-azure-open-ai.openai.azure.com/openai/deployments/gpt-4o/chat/completions?api-version=2024-08-01-preview"
 
+# Azure OpenAI prices in USD per million tokens (gpt-4o), for cost estimates and budgets
+LLM_PRICE_INPUT = 2.50
+LLM_PRICE_CACHED_INPUT = 1.25
+LLM_PRICE_OUTPUT = 10.00
+
+# Microsoft Graph API endpoint
+GRAPH_API_BASE_URL = "https://graph.microsoft.com/v1.0"
+
 # Intervals API Configuration
 INTERVALS_API_BASE_URL = "https://api.myintervals.com"
 
@@ -17,4 +25,5 @@ GRAPH_SCOPES = [
 ]
 
 # File paths
-TOKEN_FILE = ".intervals_token" 
\ No newline at end of file
+TOKEN_FILE = ".intervals_token" 
+PRIOR_FILE = ".task_prior.json"  # Learned meeting -> task pairings
\ No newline at end of file
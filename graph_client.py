@@ -1,30 +1,45 @@
 import os
 import json
 import base64
-import msal
 import requests
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
-from config import TENANT_ID, CLIENT_ID, GRAPH_SCOPES
-from utils import parse_datetime, clean_text
-import re
-import urllib.parse
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from config import TENANT_ID, CLIENT_ID, GRAPH_SCOPES, GRAPH_API_BASE_URL
+from utils import parse_datetime, clean_text, as_utc
+from text_utils import parse_join_url
+from metrics import instrumented_session
+from models import Meeting, Attendee
+
+# A report counts for an occurrence if it started within this of the schedule
+REPORT_START_TOLERANCE = timedelta(hours=1)
+
+# Event fields the pipeline reads (see models.Meeting)
+EVENT_FIELDS = "subject,start,end,onlineMeeting,bodyPreview,organizer,type,seriesMasterId,isCancelled"
+# Events per page (Graph returns 10 by default)
+EVENT_PAGE_SIZE = 100
 
 class GraphClient:
-    def __init__(self):
+    def __init__(self, base_url: str = GRAPH_API_BASE_URL):
         """Initialize the Graph client."""
-        self.base_url = "https://graph.microsoft.com/v1.0"
+        self.base_url = base_url
         self.user_id = None
         self.access_token = None
-        self.session = requests.Session()
+        self.session = instrumented_session('graph')
+        self.app = None  # MSAL application, kept for silent token refresh
+        self.me = None
+        self.attendance_reports = {}  # Online meeting ID -> reports with records
         
     def authenticate(self) -> bool:
         """Authenticate with Microsoft Graph."""
         try:
-            app = msal.PublicClientApplication(
+            # msal is slow to import and only needed for interactive auth
+            import msal
+            
+            app = self.app or msal.PublicClientApplication(
                 client_id=CLIENT_ID,
                 authority=f"https://login.microsoftonline.com/{TENANT_ID}"
             )
+            self.app = app
             
             # Try to get token silently first
             accounts = app.get_accounts()
@@ -37,11 +52,7 @@ class GraphClient:
                 print("Authentication error:", result.get("error_description", "Unknown error"))
                 return False
             
-            self.access_token = result["access_token"]
-            self.session.headers.update({
-                "Authorization": f"Bearer {self.access_token}",
-                "Content-Type": "application/json"
-            })
+            self._set_token(result["access_token"])
             
             # Get user info using /me endpoint
             me = self.session.get(f"{self.base_url}/me")
@@ -50,6 +61,7 @@ class GraphClient:
                 return False
             
             user_data = me.json()
+            self.me = user_data
             self.user_id = user_data.get("id")  # Use id instead of userPrincipalName
             
             if not self.user_id:
@@ -63,6 +75,30 @@ class GraphClient:
             print("Authentication error:", str(e))
             return False
     
+    def _set_token(self, access_token: str):
+        self.access_token = access_token
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.access_token}",
+            "Content-Type": "application/json"
+        })
+    
+    def refresh_token(self) -> bool:
+        """Renew the access token silently; used by long-running watch mode.
+        
+        MSAL returns the cached token while it is valid and redeems the
+        refresh token otherwise. Clients given a token from outside (no
+        MSAL application) are left as they are.
+        """
+        if self.app is None:
+            return True
+        accounts = self.app.get_accounts()
+        result = self.app.acquire_token_silent(GRAPH_SCOPES, account=accounts[0]) if accounts else None
+        if not result or "access_token" not in result:
+            print("Unable to refresh the Graph token silently")
+            return False
+        self._set_token(result["access_token"])
+        return True
+    
     def _make_request(self, endpoint: str, method: str = "GET", params: Dict = None) -> Optional[Dict]:
         """Make a request to Microsoft Graph API."""
         if not self.access_token:
@@ -70,203 +106,302 @@ class GraphClient:
             return None
             
         headers = {"Authorization": f"Bearer {self.access_token}"}
-        url = f"https://graph.microsoft.com/v1.0{endpoint}"
+        url = f"{self.base_url}{endpoint}"
         
         try:
-            response = requests.request(method, url, headers=headers, params=params)
+            response = self.session.request(method, url, headers=headers, params=params)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             print(f"API request error: {str(e)}")
             return None
     
-    def get_user_meetings(self) -> List[Dict]:
-        """Get user's meetings from the past 30 days."""
+    def get_me(self) -> Optional[Dict]:
+        """Get the signed-in user's profile (fetched once per client)."""
+        if self.me is None:
+            response = self.session.get(f"{self.base_url}/me")
+            if response.status_code == 200:
+                self.me = response.json()
+        return self.me
+    
+    def get_user_meetings(self, start_time: Optional[datetime] = None,
+                          end_time: Optional[datetime] = None) -> List[Meeting]:
+        """Get user's meetings from the past 30 days, or from a given range.
+        
+        Attendance is not fetched here; get_meeting_attendance resolves it
+        per meeting while processing. Errors are printed and give [].
+        """
         try:
-            # Get user information first
-            user_info = self.session.get(f"{self.base_url}/me").json()
-            if not user_info:
-                print("Failed to retrieve user information")
-                return []
-            
             # Calculate date range
-            end_time = datetime.utcnow()
-            start_time = end_time - timedelta(days=30)
+            end_time = end_time or datetime.utcnow()
+            start_time = start_time or end_time - timedelta(days=30)
             
             print(f"Target User ID: {self.user_id}")
             print(f"Retrieving meetings from {start_time.isoformat()}Z to {end_time.isoformat()}Z...")
             
-            # Build filter for date range
-            date_filter = f"start/dateTime ge '{start_time.isoformat()}Z' and end/dateTime le '{end_time.isoformat()}Z'"
-            
-            # Get meetings
-            meetings_url = f"{self.base_url}/users/{self.user_id}/events"
-            params = {
-                "$filter": date_filter,
-                "$select": "subject,start,end,onlineMeeting,bodyPreview"
-            }
-            
-            meetings_response = self.session.get(meetings_url, params=params)
-            if meetings_response.status_code != 200:
-                print(f"Error getting meetings: {meetings_response.status_code} {meetings_response.reason}")
-                return []
-            
-            meetings_data = meetings_response.json()
-            processed_meetings = []
-            
-            for meeting in meetings_data.get("value", []):
-                print(f"\nProcessing meeting: {meeting['subject']}")
-                if meeting.get("bodyPreview"):
-                    print(f"Meeting Description:\n{meeting['bodyPreview']}")
-                
-                if meeting.get("onlineMeeting"):
-                    # Get attendance data
-                    start_time = parse_datetime(meeting["start"]["dateTime"])
-                    end_time = parse_datetime(meeting["end"]["dateTime"])
-                    attendance_data = self.get_meeting_attendance(
-                        meeting["onlineMeeting"]["joinUrl"],
-                        start_time,
-                        end_time
-                    )
-                    
-                    if attendance_data:
-                        # Add attendance description to meeting
-                        attendance_desc = ["Attendance Report"]
-                        for attendee in attendance_data["attendees"]:
-                            name = attendee["name"]
-                            email = attendee["email"]
-                            duration = attendee["duration"]
-                            attendance_desc.append(f"User: {name}, Email: {email}, Total Time: {duration} seconds")
-                        meeting["description"] = "\n".join(attendance_desc)
-                    else:
-                        # Use scheduled duration as fallback
-                        duration_seconds = int((end_time - start_time).total_seconds())
-                        attendance_desc = [
-                            "Attendance Report",
-                            "Note: Using scheduled duration.",
-                            f"User: {user_info['displayName']}, Email: {self.user_id}, Total Time: {duration_seconds} seconds"
-                        ]
-                        meeting["description"] = "\n".join(attendance_desc)
-                else:
-                    # Handle non-Teams meetings
-                    start_time = parse_datetime(meeting["start"]["dateTime"])
-                    end_time = parse_datetime(meeting["end"]["dateTime"])
-                    duration_seconds = int((end_time - start_time).total_seconds())
-                    
-                    attendance_desc = [
-                        "Attendance Report",
-                        "Note: Not a Teams meeting - using scheduled duration.",
-                        f"User: {user_info['displayName']}, Email: {self.user_id}, Total Time: {duration_seconds} seconds"
-                    ]
-                    meeting["description"] = "\n".join(attendance_desc)
-                    
-                processed_meetings.append(meeting)
-                
-            return processed_meetings
+            meetings = self.fetch_meetings(start_time, end_time)
+            print(f"Found {len(meetings)} meetings")
+            return meetings
         except Exception as e:
             print(f"Error fetching meetings: {str(e)}")
             return []
-            
-    def get_meeting_attendance(self, meeting_url, start_time, end_time):
-        """Get attendance report for a meeting."""
+    
+    def fetch_meetings(self, start_time: datetime, end_time: datetime) -> List[Meeting]:
+        """Get the meetings starting in [start_time, end_time) that have ended.
+        
+        Times are naive UTC. Every page is followed; errors are raised.
+        """
+        # calendarView expands recurring series into their occurrences
+        # (/events would return the series masters instead)
+        url = f"{self.base_url}/users/{self.user_id}/calendarView"
+        params = {
+            "startDateTime": f"{start_time.isoformat()}Z",
+            "endDateTime": f"{end_time.isoformat()}Z",
+            "$select": EVENT_FIELDS,
+            "$top": EVENT_PAGE_SIZE
+        }
+        
+        # The view holds every event overlapping the range; a meeting belongs
+        # to the range it starts in, and only meetings that have ended count
+        start_time, end_time, now = as_utc(start_time), as_utc(end_time), as_utc(datetime.utcnow())
+        meetings = []
+        while url:
+            response = self.session.get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            for event in data.get("value", []):
+                meeting = Meeting.from_graph(event)
+                if start_time <= as_utc(meeting.start) < end_time and as_utc(meeting.end) <= now:
+                    meetings.append(meeting)
+            # nextLink already carries the query string
+            url = data.get('@odata.nextLink')
+            params = None
+        return meetings
+    
+    def get_event(self, event_id: str) -> Optional[Meeting]:
+        """Get a single calendar event; None if it was deleted."""
+        response = self.session.get(
+            f"{self.base_url}/users/{self.user_id}/events/{event_id}",
+            params={"$select": EVENT_FIELDS}
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return Meeting.from_graph(response.json())
+    
+    def get_calendar_delta(self, start_time: datetime, end_time: datetime,
+                           delta_link: Optional[str] = None) -> Tuple[List[Meeting], List[str], Optional[str]]:
+        """Get the events changed in a calendar window since delta_link.
+        
+        Without delta_link, every event of the window (naive UTC times) is
+        returned as the baseline. Returns (changed meetings, removed event IDs, the
+        deltaLink for the next call).
+        """
+        if delta_link:
+            url, params = delta_link, None
+        else:
+            url = f"{self.base_url}/users/{self.user_id}/calendarView/delta"
+            params = {
+                "startDateTime": f"{start_time.isoformat()}Z",
+                "endDateTime": f"{end_time.isoformat()}Z"
+            }
+        
+        meetings, removed = [], []
+        while url:
+            response = self.session.get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            for event in data.get('value', []):
+                if '@removed' in event:
+                    removed.append(event['id'])
+                else:
+                    meetings.append(Meeting.from_graph(event))
+            # nextLink and deltaLink already carry the query string
+            url = data.get('@odata.nextLink')
+            params = None
+            delta_link = data.get('@odata.deltaLink', delta_link)
+        return meetings, removed, delta_link
+    
+    def create_subscription(self, notification_url: str, client_state: str,
+                            expiration: datetime) -> Optional[Dict]:
+        """Subscribe to change notifications for the user's calendar events.
+        
+        Graph validates notification_url with a validation token before
+        answering, so the receiver must already be listening.
+        """
+        response = self.session.post(f"{self.base_url}/subscriptions", json={
+            "changeType": "created,updated,deleted",
+            "notificationUrl": notification_url,
+            "lifecycleNotificationUrl": notification_url,
+            "resource": f"/users/{self.user_id}/events",
+            "expirationDateTime": expiration.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            "clientState": client_state
+        })
+        if response.status_code not in (200, 201):
+            print(f"Error creating subscription: {response.status_code} {response.text}")
+            return None
+        return response.json()
+    
+    def renew_subscription(self, subscription_id: str, expiration: datetime) -> bool:
+        """Move the expiration of a subscription."""
+        response = self.session.patch(f"{self.base_url}/subscriptions/{subscription_id}", json={
+            "expirationDateTime": expiration.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        })
+        if response.status_code != 200:
+            print(f"Error renewing subscription: {response.status_code} {response.reason}")
+            return False
+        return True
+    
+    def delete_subscription(self, subscription_id: str):
+        """Remove a subscription; errors are only reported."""
         try:
-            # Extract meeting ID and organizer ID from the URL
-            print(f"Debug - Meeting URL: {meeting_url}")
-            decoded_url = urllib.parse.unquote(meeting_url)
-            
-            # Extract meeting ID
-            meeting_id_match = re.search(r"19:meeting_([^@]+)@thread\.v2", decoded_url)
-            if not meeting_id_match:
-                raise ValueError("Could not extract meeting ID from URL")
-            meeting_id = f"19:meeting_{meeting_id_match.group(1)}@thread.v2"
-            print(f"Debug - Extracted Meeting ID: {meeting_id}")
+            response = self.session.delete(f"{self.base_url}/subscriptions/{subscription_id}")
+            if response.status_code not in (200, 204, 404):
+                print(f"Error deleting subscription: {response.status_code} {response.reason}")
+        except requests.exceptions.RequestException as e:
+            print(f"Error deleting subscription: {str(e)}")
+    
+    def get_attendance_reports(self, online_meeting_id: str) -> List[Dict]:
+        """Get all attendance reports of an online meeting, records included.
+        
+        A recurring series shares one online meeting, so the reports of all
+        its occurrences come back from a single $expand request and are
+        cached for the following occurrences.
+        """
+        if online_meeting_id in self.attendance_reports:
+            return self.attendance_reports[online_meeting_id]
+        
+        reports = []
+        url = f"{self.base_url}/users/{self.user_id}/onlineMeetings/{online_meeting_id}/attendanceReports"
+        params = {"$expand": "attendanceRecords"}
+        while url:
+            response = self.session.get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            reports.extend(data.get('value', []))
+            # nextLink already carries the query string
+            url = data.get('@odata.nextLink')
+            params = None
+        
+        self.attendance_reports[online_meeting_id] = reports
+        return reports
+    
+    def select_attendance_report(self, reports: List[Dict], start_time: datetime, end_time: datetime) -> Optional[Dict]:
+        """Pick the report of the occurrence scheduled from start_time to end_time.
+        
+        The report whose meeting window overlaps the occurrence the most
+        wins. Without any overlap, a report that started within an hour of
+        the scheduled start is accepted (meetings opened early or late).
+        """
+        start_time, end_time = as_utc(start_time), as_utc(end_time)
+        best_report, best_overlap = None, 0.0
+        nearest_report, nearest_gap = None, REPORT_START_TOLERANCE
+        
+        for report in reports:
+            if not report.get('meetingStartDateTime'):
+                continue
+            report_start = as_utc(parse_datetime(report['meetingStartDateTime']))
+            report_end = as_utc(parse_datetime(report.get('meetingEndDateTime') or report['meetingStartDateTime']))
             
-            # Extract organizer ID
-            organizer_match = re.search(r'"Oid":"([^"]+)"', decoded_url)
-            if not organizer_match:
-                raise ValueError("Could not extract organizer ID from URL")
-            organizer_oid = organizer_match.group(1)
-            print(f"Debug - Organizer OID: {organizer_oid}")
+            overlap = (min(end_time, report_end) - max(start_time, report_start)).total_seconds()
+            if overlap > best_overlap:
+                best_report, best_overlap = report, overlap
             
-            # Format the meeting ID as required
-            formatted_string = f"1*{organizer_oid}*0**{meeting_id}"
-            base64_meeting_id = base64.b64encode(formatted_string.encode('utf-8')).decode('utf-8')
-            print(f"Debug - Base64 Meeting ID: {base64_meeting_id}")
+            gap = abs(report_start - start_time)
+            if gap <= nearest_gap:
+                nearest_report, nearest_gap = report, gap
+        
+        return best_report or nearest_report
+    
+    def get_report_records(self, online_meeting_id: str, report: Dict) -> List[Dict]:
+        """Attendance records of a report, following record paging if needed."""
+        if 'attendanceRecords' in report:
+            records = list(report['attendanceRecords'])
+            url = report.get('attendanceRecords@odata.nextLink')
+        else:
+            # Expansion not applied by the service; fetch the records directly
+            records = []
+            url = (f"{self.base_url}/users/{self.user_id}/onlineMeetings/{online_meeting_id}"
+                   f"/attendanceReports/{report['id']}/attendanceRecords")
+        
+        while url:
+            response = self.session.get(url)
+            response.raise_for_status()
+            data = response.json()
+            records.extend(data.get('value', []))
+            url = data.get('@odata.nextLink')
+        return records
+    
+    @staticmethod
+    def online_meeting_id(meeting_url: str) -> str:
+        """The onlineMeeting ID of a Teams join URL."""
+        # Extract meeting ID and organizer ID from the URL
+        join_info = parse_join_url(meeting_url)
+        
+        # Format the meeting ID as required
+        formatted_string = f"1*{join_info.organizer_oid}*0**{join_info.meeting_id}"
+        return base64.b64encode(formatted_string.encode('utf-8')).decode('utf-8')
+    
+    def attendance_status(self, meeting_url: str, start_time: datetime, end_time: datetime) -> str:
+        """Whether an occurrence's attendance report is 'ready', 'pending' or 'unavailable'.
+        
+        Reports appear some minutes after a meeting ends, so they are
+        fetched fresh; the answer stays cached for get_meeting_attendance.
+        """
+        try:
+            online_meeting_id = self.online_meeting_id(meeting_url)
+        except ValueError:
+            return 'unavailable'
+        
+        self.attendance_reports.pop(online_meeting_id, None)
+        try:
+            reports = self.get_attendance_reports(online_meeting_id)
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status == 403:
+                # Only the organizer can read attendance reports
+                return 'unavailable'
+            if status == 404:
+                return 'pending'
+            raise
+        return 'ready' if self.select_attendance_report(reports, start_time, end_time) else 'pending'
+    
+    def get_meeting_attendance(self, meeting_url, start_time, end_time) -> List[Attendee]:
+        """Get the attendees of a meeting occurrence."""
+        try:
+            base64_meeting_id = self.online_meeting_id(meeting_url)
             
             try:
-                # Get attendance reports
-                reports_url = f"{self.base_url}/users/{self.user_id}/onlineMeetings/{base64_meeting_id}/attendanceReports"
-                reports_response = self.session.get(reports_url)
-                reports_response.raise_for_status()
-                reports_data = reports_response.json()
-                
-                if not reports_data.get('value'):
-                    raise ValueError("No attendance reports found")
-                
-                report_id = reports_data['value'][0]['id']
-                print(f"Debug - Report ID: {report_id}")
-                
-                # Get attendance records
-                records_url = f"{self.base_url}/users/{self.user_id}/onlineMeetings/{base64_meeting_id}/attendanceReports/{report_id}/attendanceRecords"
-                records_response = self.session.get(records_url)
-                records_response.raise_for_status()
-                records_data = records_response.json()
-                
-                if not records_data.get('value'):
-                    raise ValueError("No attendance records found")
-                
-                return {
-                    'attendees': [
-                        {
-                            'name': record['identity'].get('displayName', 'Unknown User'),
-                            'email': record.get('emailAddress', 'No Email'),
-                            'duration': record['totalAttendanceInSeconds']
-                        }
-                        for record in records_data['value']
-                    ]
-                }
-            
+                reports = self.get_attendance_reports(base64_meeting_id)
             except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 403:
-                    print(f"API request error: {str(e)}")
-                    # Fall back to scheduled duration with current user info
-                    duration_seconds = int((end_time - start_time).total_seconds())
-                    me_response = self.session.get(f"{self.base_url}/me")
-                    if me_response.status_code == 200:
-                        user_data = me_response.json()
-                        return {
-                            'attendees': [
-                                {
-                                    'name': user_data.get('displayName', 'Current User'),
-                                    'email': user_data.get('userPrincipalName', self.user_id),
-                                    'duration': duration_seconds
-                                }
-                            ]
-                        }
+                if e.response is not None and e.response.status_code in (403, 404):
+                    # Remember the failure so other occurrences skip the request
+                    self.attendance_reports[base64_meeting_id] = []
                 raise
+            
+            if not reports:
+                raise ValueError("No attendance reports found")
+            
+            report = self.select_attendance_report(reports, start_time, end_time)
+            if not report:
+                raise ValueError("No attendance report for this occurrence")
+            print(f"Debug - Report ID: {report['id']}")
+            
+            records = self.get_report_records(base64_meeting_id, report)
+            if not records:
+                raise ValueError("No attendance records found")
+            
+            return [Attendee.from_record(record) for record in records]
         
         except Exception as e:
             print(f"Error getting attendance: {str(e)}")
             # Fall back to scheduled duration with current user info
             duration_seconds = int((end_time - start_time).total_seconds())
-            me_response = self.session.get(f"{self.base_url}/me")
-            if me_response.status_code == 200:
-                user_data = me_response.json()
-                return {
-                    'attendees': [
-                        {
-                            'name': user_data.get('displayName', 'Current User'),
-                            'email': user_data.get('userPrincipalName', self.user_id),
-                            'duration': duration_seconds
-                        }
-                    ]
-                }
-            return {
-                'attendees': [
-                    {
-                        'name': 'Current User',
-                        'email': self.user_id,
-                        'duration': duration_seconds
-                    }
-                ]
-            } 
\ No newline at end of file
+            user_data = self.get_me()
+            if user_data:
+                return [Attendee(
+                    name=user_data.get('displayName', 'Current User'),
+                    email=user_data.get('userPrincipalName', self.user_id),
+                    duration=duration_seconds
+                )]
+            return [Attendee(name='Current User', email=self.user_id, duration=duration_seconds)]
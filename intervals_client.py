@@ -1,11 +1,17 @@
 import requests
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, FrozenSet, Iterable, Set, Tuple
 from config import INTERVALS_API_BASE_URL
 from utils import encode_basic_auth, clean_text, to_intervals_date
+from metrics import instrumented_session
+from text_utils import description_fingerprint
+
+# Entries requested per page when bulk-reading /time
+TIME_ENTRY_PAGE_SIZE = 500
 
 class IntervalsClient:
-    def __init__(self, api_token: str):
+    def __init__(self, api_token: str, base_url: str = INTERVALS_API_BASE_URL):
         self.api_token = api_token
+        self.base_url = base_url
         # Ensure token ends with colon
         if not self.api_token.endswith(':'):
             self.api_token += ':'
@@ -13,6 +19,8 @@ class IntervalsClient:
             "Authorization": f"Basic {encode_basic_auth(self.api_token)}",
             "Content-Type": "application/json"
         }
+        self.session = instrumented_session('intervals')
+        self.session.headers.update(self.headers)
         self.current_user = None
     
     @property
@@ -23,19 +31,12 @@ class IntervalsClient:
     def get_current_user(self) -> Optional[Dict[str, Any]]:
         """Get current user information."""
         try:
-            print(f"Making request to {INTERVALS_API_BASE_URL}/me")
-            response = requests.get(
-                f"{INTERVALS_API_BASE_URL}/me",
-                headers=self.headers
-            )
-            print(f"Response status code: {response.status_code}")
-            
+            response = self.session.get(f"{self.base_url}/me")
             if response.status_code != 200:
-                print(f"Error response: {response.text}")
+                print(f"Error fetching user: {response.status_code} {response.reason}")
                 return None
                 
             data = response.json()
-            print(f"Response data: {data}")
             
             if data.get('me') and isinstance(data['me'], list) and len(data['me']) > 0:
                 user = data['me'][0]
@@ -54,10 +55,7 @@ class IntervalsClient:
     def get_tasks(self) -> List[Dict[str, Any]]:
         """Get all tasks."""
         try:
-            response = requests.get(
-                f"{INTERVALS_API_BASE_URL}/task",
-                headers=self.headers
-            )
+            response = self.session.get(f"{self.base_url}/task")
             response.raise_for_status()
             data = response.json()
             
@@ -71,10 +69,7 @@ class IntervalsClient:
     def get_project(self, project_id: int) -> Optional[Dict[str, Any]]:
         """Get project information."""
         try:
-            response = requests.get(
-                f"{INTERVALS_API_BASE_URL}/project/{project_id}",
-                headers=self.headers
-            )
+            response = self.session.get(f"{self.base_url}/project/{project_id}")
             response.raise_for_status()
             data = response.json()
             
@@ -92,9 +87,8 @@ class IntervalsClient:
             if "description" in time_entry:
                 time_entry["description"] = clean_text(time_entry["description"], remove_emoji=True)
             
-            response = requests.post(
-                f"{INTERVALS_API_BASE_URL}/time",
-                headers=self.headers,
+            response = self.session.post(
+                f"{self.base_url}/time",
                 json=time_entry
             )
             response.raise_for_status()
@@ -102,4 +96,106 @@ class IntervalsClient:
             return True
         except requests.exceptions.RequestException as e:
             print(f"Error posting time entry: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
+    
+    def get_time_entries(self, person_id: str, date_begin: str, date_end: str) -> List[Dict[str, Any]]:
+        """Get all time entries of a person between two dates (YYYY-MM-DD).
+        
+        Pages through /time until listcount entries have been read (or, without
+        a listcount, until a short page). Errors and pages that end before
+        listcount are raised: a partial list would let existing entries be
+        posted again.
+        """
+        entries = []
+        offset = 0
+        while True:
+            response = self.session.get(
+                f"{self.base_url}/time",
+                params={
+                    'personid': person_id,
+                    'datebegin': date_begin,
+                    'dateend': date_end,
+                    'limit': TIME_ENTRY_PAGE_SIZE,
+                    'offset': offset
+                }
+            )
+            response.raise_for_status()
+            data = response.json()
+            page = data.get('time') if isinstance(data.get('time'), list) else []
+            entries.extend(page)
+            offset += len(page)
+            
+            if data.get('listcount') is None:
+                if len(page) < TIME_ENTRY_PAGE_SIZE:
+                    return entries
+                continue
+            
+            total = int(data['listcount'])
+            if offset >= total:
+                return entries
+            if not page:
+                raise ValueError(f"Time entries ended after {offset} of {total}")
+    
+    def get_time_entry_index(self, person_id: str, date_begin: str, date_end: str) -> "TimeEntryIndex":
+        """Index the existing time entries of a person between two dates."""
+        return TimeEntryIndex(self.get_time_entries(person_id, date_begin, date_end))
+
+def time_entry_key(entry: Dict[str, Any]) -> Tuple[str, str, str]:
+    """Duplicate-detection key of a time entry."""
+    return (
+        str(entry.get('date', ''))[:10],
+        str(entry.get('taskid', '')),
+        description_fingerprint(entry.get('description', ''))
+    )
+
+class TimeEntryIndex:
+    """Time entries already in Intervals, for duplicate detection.
+    
+    An entry is found by its date and description, whichever task it was
+    posted to: a meeting matched to another task by a later run is still
+    the same meeting. Aggregated entries join the descriptions of their
+    meetings with "; ", so they are also indexed by the fingerprints of
+    those parts, per day and per task and day.
+    """
+    
+    def __init__(self, entries: Iterable[Dict[str, Any]] = ()):
+        self.keys: Set[Tuple[str, str, str]] = set()
+        self.descriptions: Set[Tuple[str, str]] = set()  # (date, description fingerprint)
+        # (date, taskid) -> [(description part fingerprints, hours)]
+        self.by_task_day: Dict[Tuple[str, str], List[Tuple[FrozenSet[str], float]]] = {}
+        for entry in entries:
+            self.add(entry)
+    
+    def add(self, entry: Dict[str, Any]):
+        key = time_entry_key(entry)
+        self.keys.add(key)
+        parts = frozenset(
+            description_fingerprint(part) for part in str(entry.get('description') or '').split('; ')
+        )
+        self.descriptions.add((key[0], key[2]))
+        self.descriptions.update((key[0], part) for part in parts)
+        self.by_task_day.setdefault(key[:2], []).append((parts, float(entry.get('time') or 0)))
+    
+    def __contains__(self, key: Tuple[str, str, str]) -> bool:
+        return key in self.keys or (key[0], key[2]) in self.descriptions
+    
+    def __len__(self) -> int:
+        return len(self.keys)
+    
+    def has_for_task(self, key: Tuple[str, str, str]) -> bool:
+        """Whether the entry is in Intervals under the key's own task."""
+        date, task_id, fingerprint = key
+        return key in self.keys or bool(self.covered(date, task_id, [fingerprint])[0])
+    
+    def covered(self, date: str, task_id: str, fingerprints: Iterable[str]) -> Tuple[Set[str], float]:
+        """Which fingerprints the task's entries of that day already cover.
+        
+        Returns those fingerprints and the hours of the entries covering them.
+        """
+        wanted = set(fingerprints)
+        found, hours = set(), 0.0
+        for parts, entry_hours in self.by_task_day.get((str(date)[:10], str(task_id)), ()):
+            if parts & wanted:
+                found |= parts & wanted
+                hours += entry_hours
+        return found, hours
@@ -1,12 +1,224 @@
 #!/usr/bin/env python3
 
-from meeting_processor import MeetingProcessor
+import argparse
+import sys
+from datetime import date
 
-def main():
+# Heavy dependencies (requests, msal) are imported by the command handlers,
+# so `--help` and argument errors return without loading them.
+
+COMMANDS = {
+    'sync': "Match meetings to tasks and post time entries (default)",
+    'dry-run': "Run the full flow and print the report without posting",
+    'match-only': "Match meetings to tasks without posting time entries",
+    'report': "Show attendance reports only, without matching or posting",
+    'watch': "Keep running and log meetings shortly after they end",
+    'backfill': "Log the meetings of a past date range, resuming where a run stopped",
+}
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser."""
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Log Microsoft Teams meeting attendance as Intervals time entries."
+    )
+    parser.add_argument(
+        "--metrics-out", metavar="PATH",
+        help="write run metrics to PATH: JSON for *.json, otherwise Prometheus "
+             "text format (e.g. a node_exporter textfile *.prom)"
+    )
+    parser.add_argument(
+        "--profile", metavar="PREFIX", nargs="?", const="",
+        help="profile the run and write PREFIX.pstats, PREFIX.collapsed.txt, "
+             "PREFIX.speedscope.json and a PREFIX.top.txt summary "
+             "(default prefix: profile_<timestamp>)"
+    )
+    parser.add_argument(
+        "--profile-top", metavar="N", type=int, default=25,
+        help="hot functions listed in the profile summary (default: 25)"
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    commands = {}
+    for name, help_text in COMMANDS.items():
+        commands[name] = subparsers.add_parser(name, help=help_text, description=help_text)
+    
+    for name in ('sync', 'dry-run', 'match-only', 'backfill'):
+        commands[name].add_argument(
+            "--aggregate", action="store_true",
+            help="post one time entry per task and day, summing exact attendance before rounding"
+        )
+    
+    for name in ('sync', 'dry-run', 'match-only', 'watch', 'backfill'):
+        commands[name].add_argument(
+            "--llm-budget-tokens", metavar="N", type=int,
+            help="stop AI matching after N prompt and completion tokens; "
+                 "later meetings are matched locally only"
+        )
+        commands[name].add_argument(
+            "--llm-budget-usd", metavar="USD", type=float,
+            help="stop AI matching once its estimated cost reaches USD"
+        )
+    
+    for name in ('dry-run', 'match-only'):
+        commands[name].add_argument(
+            "--output", metavar="PATH",
+            help="write proposed time entries to PATH "
+                 "(match-only default: proposed_entries_<timestamp>.json)"
+        )
+        commands[name].add_argument(
+            "--format", choices=("json", "csv"),
+            help="output format (default: from the file extension, else json)"
+        )
+    
+    watch = commands['watch']
+    watch.add_argument(
+        "--listen", metavar="HOST:PORT",
+        help="receive Graph change notifications on HOST:PORT "
+             "(without it, only the periodic delta sync finds meetings)"
+    )
+    watch.add_argument(
+        "--public-url", metavar="URL",
+        help="HTTPS URL Graph posts notifications to, forwarded to --listen "
+             "(default: the local receiver URL)"
+    )
+    watch.add_argument(
+        "--delta-minutes", type=float, default=15,
+        help="minutes between calendar delta syncs (default: 15)"
+    )
+    watch.add_argument(
+        "--attendance-delay-minutes", type=float, default=2,
+        help="minutes after a meeting ends before its attendance report is read (default: 2)"
+    )
+    watch.add_argument(
+        "--dry-run", action="store_true", help="match meetings without posting time entries"
+    )
+    
+    backfill = commands['backfill']
+    backfill.add_argument(
+        "--start", metavar="YYYY-MM-DD", type=date.fromisoformat, required=True,
+        help="first day to backfill"
+    )
+    backfill.add_argument(
+        "--end", metavar="YYYY-MM-DD", type=date.fromisoformat,
+        help="last day to backfill, inclusive (default: today, or the end "
+             "recorded in the checkpoint when resuming)"
+    )
+    backfill.add_argument(
+        "--shard", choices=("day", "week"), default="week",
+        help="days processed as one unit of work and checkpoint (default: week)"
+    )
+    backfill.add_argument(
+        "--workers", type=int, default=4, help="shards processed in parallel (default: 4)"
+    )
+    backfill.add_argument(
+        "--checkpoint", metavar="PATH",
+        help="checkpoint file (default: .backfill_<start>_<end>_<shard>.json, "
+             "or .backfill_<start>_<shard>.json without --end)"
+    )
+    backfill.add_argument(
+        "--restart", action="store_true", help="ignore the checkpoint and process every shard again"
+    )
+    backfill.add_argument(
+        "--dry-run", action="store_true", help="match meetings without posting time entries"
+    )
+    
+    for command in commands.values():
+        command.add_argument(
+            "--export", metavar="PATH",
+            help="stream one row per processed meeting to PATH for analysis"
+        )
+        command.add_argument(
+            "--export-format", choices=("csv", "jsonl", "parquet"),
+            help="export format (default: from the file extension, else csv; "
+                 "parquet needs pyarrow)"
+        )
+    return parser
+
+def run_command(args: argparse.Namespace) -> None:
+    """Run the meeting processor for the selected command."""
+    from meeting_processor import MeetingProcessor
+
+    command = args.command or 'sync'
+    processor = MeetingProcessor(
+        post_entries=command == 'sync' or (command in ('watch', 'backfill') and not args.dry_run),
+        match_meetings=command != 'report',
+        aggregate=getattr(args, 'aggregate', False),
+        export_path=getattr(args, 'export', None),
+        export_format=getattr(args, 'export_format', None),
+        llm_token_budget=getattr(args, 'llm_budget_tokens', None),
+        llm_cost_budget=getattr(args, 'llm_budget_usd', None)
+    )
+    
+    output = getattr(args, 'output', None)
+    if command == 'match-only' and not output:
+        from datetime import datetime
+        extension = getattr(args, 'format', None) or 'json'
+        output = f"proposed_entries_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    
+    def run():
+        if command == 'watch':
+            run_watch(processor, args)
+        elif command == 'backfill':
+            run_backfill(processor, args)
+        else:
+            processor.run(proposed_output=output, proposed_format=getattr(args, 'format', None))
+    
+    try:
+        if args.profile is not None:
+            from datetime import datetime
+            from profiling import profile_call
+            prefix = args.profile or f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            profile_call(run, prefix, top=args.profile_top)
+        else:
+            run()
+    finally:
+        if args.metrics_out:
+            from metrics import metrics
+            metrics.write(args.metrics_out)
+            print(f"Metrics written to: {args.metrics_out}")
+
+def run_watch(processor, args: argparse.Namespace) -> None:
+    """Run the processor in watch mode until interrupted."""
+    import signal
+    from datetime import timedelta
+    from watcher import MeetingWatcher
+    
+    listen = None
+    if args.listen:
+        host, _, port = args.listen.rpartition(':')
+        listen = (host or "127.0.0.1", int(port))
+    
+    watcher = MeetingWatcher(
+        processor,
+        listen=listen,
+        public_url=args.public_url,
+        delta_interval=timedelta(minutes=args.delta_minutes),
+        attendance_delay=timedelta(minutes=args.attendance_delay_minutes),
+        metrics_path=args.metrics_out
+    )
+    # Stop cleanly (and remove the subscription) when the service manager stops us
+    signal.signal(signal.SIGTERM, lambda *_: watcher.stop())
+    watcher.run()
+
+def run_backfill(processor, args: argparse.Namespace) -> None:
+    """Backfill the requested date range in checkpointed shards."""
+    from backfill import Backfill
+    
+    if args.end and args.end < args.start:
+        raise ValueError("--end is before --start")
+    Backfill(
+        processor, args.start, args.end,
+        shard_size=args.shard,
+        workers=args.workers,
+        checkpoint_path=args.checkpoint,
+        restart=args.restart
+    ).run()
+
+def main(argv=None):
     """Main entry point for the meeting processor."""
+    args = build_parser().parse_args(argv)
     try:
-        processor = MeetingProcessor()
-        processor.run()
+        run_command(args)
     except KeyboardInterrupt:
         print("\nProcess interrupted by user")
     except Exception as e:
@@ -14,4 +226,4 @@ def main():
         raise
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main(sys.argv[1:])
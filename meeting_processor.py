@@ -1,45 +1,98 @@
-import pandas as pd
+import csv
+import json
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from utils import (
     get_saved_intervals_token, save_intervals_token,
-    format_duration, get_meeting_decimal_time, parse_datetime
+    get_meeting_decimal_time
 )
 from graph_client import GraphClient
-from intervals_client import IntervalsClient
+from intervals_client import IntervalsClient, TimeEntryIndex, time_entry_key
 from task_matcher import TaskMatcher
+from metrics import metrics
+from task_prior import TaskPrior
+from config import PRIOR_FILE
+from models import Meeting, Attendee, AttendanceStats, MatchResult
+from text_utils import description_fingerprint
+from result_export import ResultWriter, open_result_writer
+
+# Posted statuses that confirm a meeting -> task pairing
+CONFIRMED_STATUSES = ("Yes", "No - Duplicate")
 
 def to_intervals_date(dt):
     """Convert a datetime object to Intervals date format (YYYY-MM-DD)"""
     return dt.strftime('%Y-%m-%d')
 
 class MeetingProcessor:
-    def __init__(self):
-        """Initialize the meeting processor."""
-        self.graph_client = None
-        self.intervals_client = None
-        self.task_matcher = None
-        self.results = []
+    def __init__(self, post_entries: bool = True, match_meetings: bool = True,
+                 graph_client: Optional[GraphClient] = None,
+                 intervals_client: Optional[IntervalsClient] = None,
+                 task_matcher: Optional[TaskMatcher] = None,
+                 aggregate: bool = False, use_prior: bool = True,
+                 export_path: Optional[str] = None, export_format: Optional[str] = None,
+                 llm_token_budget: Optional[int] = None, llm_cost_budget: Optional[float] = None):
+        """Initialize the meeting processor.
+        
+        post_entries=False matches meetings without posting time entries
+        (dry run); match_meetings=False only reports attendance. Clients
+        passed in are used as-is instead of being created and authenticated.
+        aggregate=True posts one entry per task and day instead of one per
+        meeting. use_prior=False ignores the learned subject -> task history.
+        export_path streams every result to a CSV, JSONL or Parquet file
+        while the run progresses. llm_token_budget and llm_cost_budget (USD)
+        limit AI matching; once spent, meetings are matched locally only.
+        """
+        self.post_entries = post_entries
+        self.match_meetings = match_meetings
+        self.graph_client = graph_client
+        self.intervals_client = intervals_client
+        self.task_matcher = task_matcher
+        self.results: List[MatchResult] = []
         self.tasks = []  # Initialize tasks list
         self.current_user = None  # Add current user info
+        self.stage_times = {}  # Seconds spent per pipeline stage
+        self.aggregate = aggregate
+        self.use_prior = use_prior
+        self.aggregated_entries = []  # Entries posted when aggregating
+        self.existing_entries = TimeEntryIndex()  # Time entries already in Intervals
+        self.export_path = export_path
+        self.export_format = export_format
+        self.llm_token_budget = llm_token_budget
+        self.llm_cost_budget = llm_cost_budget
+        self.result_writer: Optional[ResultWriter] = None
+    
+    @contextmanager
+    def timed(self, stage: str):
+        """Accumulate the wall time of a block under the given stage name."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stage_times[stage] = self.stage_times.get(stage, 0.0) + elapsed
+            metrics.observe('stage_seconds', elapsed, stage=stage)
     
     def initialize(self) -> bool:
         """Initialize the processor and authenticate with services."""
         print("\nInitializing Meeting Processor...")
         
         # Initialize and authenticate Graph client
-        self.graph_client = GraphClient()
-        if not self.graph_client.authenticate():
-            print("Failed to authenticate with Microsoft Graph")
-            return False
+        if self.graph_client is None:
+            self.graph_client = GraphClient()
+            if not self.graph_client.authenticate():
+                print("Failed to authenticate with Microsoft Graph")
+                return False
         
         # Initialize and authenticate Intervals client
-        intervals_token = get_saved_intervals_token()
-        if not intervals_token:
-            print("No Intervals token found")
-            return False
+        if self.intervals_client is None:
+            intervals_token = get_saved_intervals_token()
+            if not intervals_token:
+                print("No Intervals token found")
+                return False
             
-        self.intervals_client = IntervalsClient(intervals_token)
+            self.intervals_client = IntervalsClient(intervals_token)
         self.current_user = self.intervals_client.get_current_user()
         if not self.current_user:
             print("Failed to authenticate with Intervals")
@@ -48,7 +101,18 @@ class MeetingProcessor:
         print(f"Successfully authenticated as: {self.current_user['firstname']} {self.current_user['lastname']}")
         
         # Initialize task matcher
-        self.task_matcher = TaskMatcher()
+        if self.task_matcher is None:
+            self.task_matcher = TaskMatcher()
+        if self.use_prior and self.task_matcher.prior is None:
+            self.task_matcher.prior = TaskPrior.load(PRIOR_FILE)
+        if self.llm_token_budget is not None:
+            self.task_matcher.usage.token_budget = self.llm_token_budget
+        if self.llm_cost_budget is not None:
+            self.task_matcher.usage.cost_budget = self.llm_cost_budget
+        
+        # Attendance reports need no task context
+        if not self.match_meetings:
+            return True
         
         # Get tasks from Intervals
         print("Building task context...")
@@ -62,11 +126,9 @@ class MeetingProcessor:
         
         return True
     
-    def show_attendance_report(self, meeting: Dict[str, Any], attendance_data: Optional[Dict]) -> Dict[str, Any]:
+    def show_attendance_report(self, meeting: Meeting, attendees: Optional[List[Attendee]]) -> AttendanceStats:
         """Display attendance report for a meeting and return attendance statistics."""
-        start_time = parse_datetime(meeting['start']['dateTime'])
-        end_time = parse_datetime(meeting['end']['dateTime'])
-        scheduled_duration = int((end_time - start_time).total_seconds())
+        scheduled_duration = meeting.scheduled_seconds
         
         # Get current user info
         user_name = f"{self.current_user['firstname']} {self.current_user['lastname']}"
@@ -77,120 +139,70 @@ class MeetingProcessor:
         print("=" * 45 + "\n")
         
         # Meeting Details Section
-        print(f"Meeting Subject: {meeting['subject']}")
-        print(f"Start Time: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"End Time: {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"Meeting Subject: {meeting.subject}")
+        print(f"Start Time: {meeting.start.strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"End Time: {meeting.end.strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"Scheduled Duration: {scheduled_duration // 60} minutes\n")
         
         print("----- Attendance Details -----\n")
         
-        max_attendance_seconds = scheduled_duration
-        attendee_details = []
-        total_attendance_percentage = 0
-        attendee_count = 0
-        
-        if not attendance_data or not attendance_data.get('attendees'):
+        if not attendees:
             # Use current user's info when no attendance data is available
-            attendee_details.append({
-                'name': user_name,
-                'email': user_email,
-                'duration': scheduled_duration,
-                'percentage': 100.0
-            })
-        else:
-            for attendee in attendance_data['attendees']:
-                # Skip entries without duration
-                if 'duration' not in attendee:
-                    continue
-                
-                # Calculate attendance percentage
-                duration_seconds = attendee['duration']
-                attendance_percentage = (duration_seconds / scheduled_duration) * 100
-                
-                # Use current user info if name/email is missing or shows as Unknown User
-                name = attendee.get('name', user_name)
-                if name == 'Unknown User':
-                    name = user_name
-                    
-                email = attendee.get('email', user_email)
-                if email == self.graph_client.user_id:
-                    email = user_email
-                
-                attendee_details.append({
-                    'name': name,
-                    'email': email,
-                    'duration': duration_seconds,
-                    'percentage': attendance_percentage
-                })
+            attendees = [Attendee(name=user_name, email=user_email, duration=scheduled_duration)]
         
         # Sort attendees by duration (descending)
-        attendee_details.sort(key=lambda x: x['duration'], reverse=True)
-        
-        # Display attendee details
-        for attendee in attendee_details:
-            attendee_count += 1
-            total_attendance_percentage += attendee['percentage']
-            
-            duration_minutes = attendee['duration'] // 60
+        for attendee in sorted(attendees, key=lambda a: a.duration, reverse=True):
+            # Use current user info if name/email is missing or shows as Unknown User
+            name = user_name if attendee.name == 'Unknown User' else attendee.name
+            email = user_email if attendee.email == self.graph_client.user_id else attendee.email
+            percentage = (attendee.duration / scheduled_duration) * 100 if scheduled_duration else 100.0
             
-            print(f"Attendee: {attendee['name']}")
-            print(f"Email: {attendee['email']}")
-            print(f"Duration: {duration_minutes} minutes")
-            print(f"Attendance: {attendee['percentage']:.0f}%\n")
+            print(f"Attendee: {name}")
+            print(f"Email: {email}")
+            print(f"Duration: {attendee.duration // 60} minutes")
+            print(f"Attendance: {percentage:.0f}%\n")
         
         print("=" * 45)
         
+        stats = AttendanceStats.compute(attendees, scheduled_duration)
+        
         # Calculate actual duration for display
-        actual_duration_hours = max([a['duration'] for a in attendee_details]) // 3600 if attendee_details else 0
-        actual_duration_minutes = (max([a['duration'] for a in attendee_details]) % 3600) // 60 if attendee_details else 0
-        actual_duration_seconds = max([a['duration'] for a in attendee_details]) % 60 if attendee_details else 0
-        
-        print(f"Actual duration: {actual_duration_hours} hours, {actual_duration_minutes} minutes, {actual_duration_seconds} seconds")
-        exact_hours = max([a['duration'] for a in attendee_details]) / 3600 if attendee_details else 0
-        print(f"Exact attendance time: {exact_hours:.1f} hours")
-        
-        return {
-            'attendee_count': attendee_count,
-            'avg_attendance': total_attendance_percentage / attendee_count if attendee_count > 0 else 0,
-            'max_duration': max([a['duration'] for a in attendee_details]) if attendee_details else scheduled_duration
-        }
+        hours, remainder = divmod(stats.max_duration, 3600)
+        print(f"Actual duration: {hours} hours, {remainder // 60} minutes, {remainder % 60} seconds")
+        print(f"Exact attendance time: {stats.max_duration / 3600:.1f} hours")
+        
+        return stats
     
-    def process_meeting(self, meeting: Dict[str, Any]) -> Dict[str, Any]:
+    def process_meeting(self, meeting: Meeting) -> Optional[MatchResult]:
         """Process a single meeting."""
-        print(f"\nProcessing meeting: {meeting['subject']}")
-        print(f"Meeting Description:\n{meeting.get('bodyPreview', '')}")
+        print(f"\nProcessing meeting: {meeting.subject}")
+        print(f"Meeting Description:\n{meeting.body_preview}")
 
-        start_time = parse_datetime(meeting['start']['dateTime'])
-        end_time = parse_datetime(meeting['end']['dateTime'])
-        attendance_data = None
-        
-        # Get current user info
-        user_name = f"{self.current_user['firstname']} {self.current_user['lastname']}"
-        user_email = f"{self.current_user['username']}@M365x65088219.onmicrosoft.com"
+        start_time = meeting.start
+        attendees = None
         
-        if meeting.get('onlineMeeting'):
+        if meeting.join_url:
             try:
                 # Get attendance data
-                attendance_data = self.graph_client.get_meeting_attendance(
-                    meeting['onlineMeeting']['joinUrl'],
-                    start_time,
-                    end_time
-                )
+                with self.timed('attendance'):
+                    attendees = self.graph_client.get_meeting_attendance(
+                        meeting.join_url,
+                        meeting.start,
+                        meeting.end
+                    )
             except Exception as e:
                 print(f"Failed to get attendance data: {str(e)}")
-                # Create default attendance data with current user
-                attendance_data = {
-                    'attendees': [{
-                        'name': user_name,
-                        'email': user_email,
-                        'duration': int((end_time - start_time).total_seconds()),
-                        'role': 'Organizer'
-                    }]
-                }
+                # Default attendance: the current user for the whole meeting
+                attendees = [Attendee(
+                    name=f"{self.current_user['firstname']} {self.current_user['lastname']}",
+                    email=f"{self.current_user['username']}@M365x65088219.onmicrosoft.com",
+                    duration=meeting.scheduled_seconds,
+                    role='Organizer'
+                )]
 
         # Get attendance report
-        attendance_report = self.show_attendance_report(meeting, attendance_data)
-        duration_seconds = attendance_report['max_duration']
+        attendance_report = self.show_attendance_report(meeting, attendees)
+        duration_seconds = attendance_report.max_duration
 
         # Calculate billable hours (rounded to nearest 0.1)
         actual_duration = timedelta(seconds=duration_seconds)
@@ -198,41 +210,38 @@ class MeetingProcessor:
         billable_hours = round(duration_seconds / 3600, 1)
         print(f"Billable hours calculated: {billable_hours}")
 
-        # Skip posting if billable hours is 0
-        if billable_hours == 0:
+        def unmatched(task_title: str, match_status: str, posted: str) -> MatchResult:
+            return MatchResult(
+                meeting=meeting.subject,
+                time=start_time.strftime('%Y-%m-%d %H:%M'),
+                task_id='N/A',
+                task_title=task_title,
+                match_status=match_status,
+                posted=posted,
+                billable_duration=billable_hours,
+                duration=duration_seconds,
+                actual_minutes=round(duration_seconds / 60),
+                scheduled_duration=duration_seconds
+            )
+
+        # Skip posting if billable hours is 0; aggregation sums the exact
+        # seconds first, so short meetings still count there
+        if billable_hours == 0 and not (self.aggregate and duration_seconds > 0):
             print("Skipping time entry posting - zero duration")
-            return {
-                'meeting': meeting['subject'],
-                'time': start_time.strftime('%Y-%m-%d %H:%M'),
-                'task_id': 'N/A',
-                'task_title': 'Zero Duration',
-                'match_status': 'Not Posted',
-                'posted': 'No - Zero Duration',
-                'billable_duration': billable_hours,
-                'duration': duration_seconds,
-                'actual_minutes': round(duration_seconds / 60),
-                'scheduled_duration': duration_seconds
-            }
+            return unmatched('Zero Duration', 'Not Posted', 'No - Zero Duration')
+
+        if not self.match_meetings:
+            return unmatched('Not Matched', 'Skipped', 'No - Report Only')
 
         # Match meeting to task
-        matched_task_id = self.task_matcher.direct_match(meeting['subject'], self.tasks)
-        if not matched_task_id:
-            matched_task_id = self.task_matcher.ai_match(meeting['subject'], self.tasks)
+        with self.timed('match'):
+            matched_task_id, match_method = self.task_matcher.match(
+                meeting.subject, self.tasks, meeting.organizer, meeting.series_id, meeting.start
+            )
 
         if not matched_task_id or matched_task_id == "NO_MATCH":
             print("No task match found for meeting")
-            return {
-                'meeting': meeting['subject'],
-                'time': start_time.strftime('%Y-%m-%d %H:%M'),
-                'task_id': 'N/A',
-                'task_title': 'No Match',
-                'match_status': 'Not Matched',
-                'posted': 'No',
-                'billable_duration': billable_hours,
-                'duration': duration_seconds,
-                'actual_minutes': round(duration_seconds / 60),
-                'scheduled_duration': duration_seconds
-            }
+            return unmatched('No Match', 'Not Matched', 'No')
 
         matched_task = next((task for task in self.tasks if task['id'] == matched_task_id), None)
         if not matched_task:
@@ -250,25 +259,143 @@ class MeetingProcessor:
             'worktypeid': 799573,  # Default worktype ID
             'date': to_intervals_date(start_time),
             'time': billable_hours,
-            'description': f"{meeting['subject']} (Actual attendance: {round(duration_seconds / 60)} minutes)",
+            'description': f"{meeting.subject} (Actual attendance: {round(duration_seconds / 60)} minutes)",
             'billable': True
         }
 
-        post_success = self.intervals_client.post_time_entry(time_entry)
-        post_status = "Yes" if post_success else "Failed"
-        
-        return {
-            'meeting': meeting['subject'],
-            'time': start_time.strftime('%Y-%m-%d %H:%M'),
-            'task_id': matched_task['id'],
-            'task_title': matched_task['title'],
-            'match_status': 'Matched',
-            'posted': post_status,
-            'billable_duration': billable_hours,
-            'duration': duration_seconds,
-            'actual_minutes': round(duration_seconds / 60),
-            'scheduled_duration': duration_seconds
-        }
+        if self.aggregate:
+            # Posted per task and day once all meetings are processed
+            post_status = "Pending"
+        else:
+            post_status = self.submit_time_entry(time_entry)
+        
+        result = MatchResult(
+            meeting=meeting.subject,
+            time=start_time.strftime('%Y-%m-%d %H:%M'),
+            task_id=matched_task['id'],
+            task_title=matched_task['title'],
+            match_status='Matched',
+            match_method=match_method,
+            posted=post_status,
+            billable_duration=billable_hours,
+            duration=duration_seconds,
+            actual_minutes=round(duration_seconds / 60),
+            scheduled_duration=duration_seconds,
+            organizer=meeting.organizer,
+            series_id=meeting.series_id,
+            time_entry=time_entry
+        )
+        self.confirm_match(result)
+        return result
+    
+    def handle_meeting(self, meeting: Meeting) -> Optional[MatchResult]:
+        """Process a meeting and record its result, latency and export row."""
+        meeting_started = time.perf_counter()
+        result = self.process_meeting(meeting)
+        if result is None:
+            return None
+        result.latency_ms = (time.perf_counter() - meeting_started) * 1000
+        metrics.observe('meeting_seconds', result.latency_ms / 1000)
+        metrics.inc('meetings_total', status=result.match_status)
+        self.results.append(result)
+        self.export_results([result])
+        return result
+    
+    def confirm_match(self, result: MatchResult):
+        """Teach the matcher a pairing once its time entry is in Intervals."""
+        if result.posted not in CONFIRMED_STATUSES:
+            return
+        if result.posted == "No - Duplicate" and not self.existing_entries.has_for_task(time_entry_key(result.time_entry)):
+            # Logged under another task: not a confirmation of this match
+            return
+        self.task_matcher.record_confirmed(
+            result.meeting, result.organizer, result.series_id,
+            result.task_id, datetime.strptime(result.time, '%Y-%m-%d %H:%M')
+        )
+    
+    def load_existing_entries(self, meetings: List[Meeting]):
+        """Bulk-read the time entries already in Intervals for the meetings' dates."""
+        dates = [to_intervals_date(m.start) for m in meetings]
+        if not dates:
+            return
+        
+        self.existing_entries = self.intervals_client.get_time_entry_index(
+            self.intervals_client.user_id, min(dates), max(dates)
+        )
+        print(f"Found {len(self.existing_entries)} existing time entries between {min(dates)} and {max(dates)}")
+    
+    def submit_time_entry(self, time_entry: Dict[str, Any]) -> str:
+        """Post a time entry unless it already exists; return the posted status."""
+        key = time_entry_key(time_entry)
+        if key in self.existing_entries:
+            print(f"Skipping time entry - already in Intervals ({time_entry['date']}, task {time_entry['taskid']})")
+            metrics.inc('time_entries_total', status='duplicate')
+            return "No - Duplicate"
+        
+        if not self.post_entries:
+            print(f"Dry run - not posting time entry ({time_entry['time']} hours)")
+            metrics.inc('time_entries_total', status='dry_run')
+            return "No - Dry Run"
+        
+        with self.timed('post'):
+            post_success = self.intervals_client.post_time_entry(time_entry)
+        metrics.inc('time_entries_total', status='posted' if post_success else 'failed')
+        if not post_success:
+            return "Failed"
+        
+        # Guard against the same entry coming up again later in this run
+        self.existing_entries.add(time_entry)
+        return "Yes"
+    
+    def post_aggregated_entries(self) -> List[MatchResult]:
+        """Post one time entry per (person, task, worktype, date).
+        
+        The exact attendance seconds of all meetings in a group are summed
+        before rounding to 0.1 h, and their descriptions are combined.
+        Meetings already in Intervals are found by their description within
+        the task's entries of that day, and only the missing hours are posted.
+        Returns the results whose posted status was settled.
+        """
+        groups = {}
+        for result in self.results:
+            if result.posted != "Pending":
+                continue
+            entry = result.time_entry
+            key = (entry['personid'], entry['taskid'], entry['worktypeid'], entry['date'])
+            groups.setdefault(key, []).append(result)
+        
+        for group in groups.values():
+            # Meetings already in an entry of this task and day (from an
+            # earlier run) are not posted again; the new entry carries the
+            # rest of the day's hours
+            first = group[0].time_entry
+            fingerprints = [description_fingerprint(r.time_entry['description']) for r in group]
+            covered, covered_hours = self.existing_entries.covered(first['date'], first['taskid'], fingerprints)
+            new = [r for r, fingerprint in zip(group, fingerprints) if fingerprint not in covered]
+            
+            seconds = sum(r.duration for r in group)
+            hours = round(round(seconds / 3600, 1) - covered_hours, 1)
+            time_entry = dict(first)
+            time_entry['time'] = hours
+            time_entry['description'] = "; ".join(r.time_entry['description'] for r in new)
+            
+            if not new:
+                print(f"Skipping aggregated entry for task {first['taskid']} on {first['date']} - already in Intervals")
+                metrics.inc('time_entries_total', status='duplicate')
+                post_status = "No - Duplicate"
+            elif hours <= 0:
+                print(f"Skipping aggregated entry for task {time_entry['taskid']} on {time_entry['date']} - zero duration")
+                post_status = "No - Zero Duration"
+            else:
+                print(f"Aggregated {len(new)} meeting(s) for task {time_entry['taskid']} on {time_entry['date']}")
+                post_status = self.submit_time_entry(time_entry)
+            
+            self.aggregated_entries.append({'time_entry': time_entry, 'meetings': len(new), 'posted': post_status})
+            for result, fingerprint in zip(group, fingerprints):
+                result.posted = "No - Duplicate" if fingerprint in covered else post_status
+                self.confirm_match(result)
+        
+        return [result for group in groups.values() for result in group]
     
     def show_statistics(self):
         """Display processing statistics."""
@@ -280,15 +407,22 @@ class MeetingProcessor:
         
         # Calculate statistics
         total_meetings = len(self.results)
-        matched_meetings = sum(1 for r in self.results if r['match_status'] == 'Matched')
-        posted_entries = sum(1 for r in self.results if r['posted'] == 'Yes')
-        total_billable = sum(r['billable_duration'] for r in self.results if r['posted'] == 'Yes')
+        matched_meetings = sum(1 for r in self.results if r.match_status == 'Matched')
+        posted_entries = sum(1 for r in self.results if r.posted == 'Yes')
+        total_billable = sum(r.billable_duration for r in self.results if r.posted == 'Yes')
+        if self.aggregate:
+            total_billable = round(sum(
+                e['time_entry']['time'] for e in self.aggregated_entries if e['posted'] == 'Yes'
+            ), 1)
         
         # Display summary
         print("\nProcessing Summary:")
         print(f"Total Meetings: {total_meetings}")
         print(f"Successfully Matched: {matched_meetings}")
         print(f"Time Entries Posted: {posted_entries}")
+        if self.aggregate:
+            aggregated_posted = sum(1 for e in self.aggregated_entries if e['posted'] == 'Yes')
+            print(f"Aggregated Entries Posted: {aggregated_posted} (one per task and day)")
         print(f"Unmatched Meetings: {total_meetings - matched_meetings}")
         
         if total_meetings > 0:
@@ -301,92 +435,185 @@ class MeetingProcessor:
         
         print(f"\nTotal Billable Hours: {total_billable} hours")
         
+        usage = self.task_matcher.usage if self.task_matcher else None
+        if usage and usage.requests:
+            print(f"AI Matching: {usage.summary()}")
+            if usage.exhausted():
+                print("AI Matching Budget: exhausted, later meetings were matched locally only")
+        
         # Task distribution
         print("\nTask Distribution:")
         task_counts = {}
         for result in self.results:
-            if result['posted'] == 'Yes':
-                task_title = result['task_title']
+            if result.posted == 'Yes':
+                task_title = result.task_title
                 task_counts[task_title] = task_counts.get(task_title, 0) + 1
         
         for task, count in task_counts.items():
             print(f"{task}: {count} entries")
     
-    def export_results(self):
-        """Export results to a text file."""
-        if not self.results:
-            print("No results to export")
+    def open_export(self, append: bool = False):
+        """Open the export file, if one was requested."""
+        if self.export_path and self.result_writer is None:
+            self.result_writer = open_result_writer(self.export_path, self.export_format, append)
+    
+    def export_results(self, results: List[MatchResult]):
+        """Stream final results to the export file, if one is open.
+        
+        Results waiting for aggregation are held back until their posted
+        status is known.
+        """
+        if self.result_writer is None:
+            return
+        try:
+            for result in results:
+                if result.posted != "Pending":
+                    self.result_writer.write(result)
+        except (OSError, ValueError) as e:
+            print(f"Error exporting results: {str(e)}")
+            if self.export_path:
+                self.close_export()
+            else:
+                # A backfill worker's writer belongs to the processor that
+                # opened it, and the other workers are still using it
+                self.result_writer = None
+    
+    def close_export(self):
+        """Close the export file and report where it went."""
+        if self.result_writer is None:
+            return
+        writer, self.result_writer = self.result_writer, None
+        try:
+            writer.close()
+            print(f"Results exported to: {writer.path} ({writer.rows} rows)")
+        except (OSError, ValueError) as e:
+            print(f"Error exporting results: {str(e)}")
+    
+    def show_timing(self, total_seconds: float):
+        """Display per-stage timing and per-meeting latency."""
+        print("\n=== Timing Report ===")
+        
+        print("\nStage Timing:")
+        for stage, seconds in self.stage_times.items():
+            share = (seconds / total_seconds) * 100 if total_seconds > 0 else 0
+            print(f"{stage:<12} {seconds:8.3f} s  {share:5.1f}%")
+        
+        latencies = sorted(r.latency_ms for r in self.results)
+        if not latencies:
             return
         
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        report_path = f"meeting_processing_{timestamp}.txt"
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+        
+        print("\nPer-Meeting Latency:")
+        print(f"p50: {percentile(0.50):.1f} ms")
+        print(f"p95: {percentile(0.95):.1f} ms")
+        print(f"max: {latencies[-1]:.1f} ms")
+        
+        processing = self.stage_times.get('process', 0)
+        if processing > 0:
+            print(f"Throughput: {len(latencies) / processing:.1f} meetings/s")
+    
+    def write_proposed_entries(self, path: str, fmt: Optional[str] = None):
+        """Write the proposed time entries of matched meetings as JSON or CSV."""
+        fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'json')
+        
+        rows = []
+        for result in self.results:
+            entry = result.time_entry or {}
+            rows.append({
+                'meeting': result.meeting,
+                'time': result.time,
+                'match_status': result.match_status,
+                'match_method': result.match_method,
+                'task_id': result.task_id,
+                'task_title': result.task_title,
+                'projectid': entry.get('projectid'),
+                'moduleid': entry.get('moduleid'),
+                'worktypeid': entry.get('worktypeid'),
+                'date': entry.get('date'),
+                'billable_duration': result.billable_duration,
+                'actual_minutes': result.actual_minutes,
+                'description': entry.get('description'),
+                'latency_ms': round(result.latency_ms, 3)
+            })
         
         try:
-            # Create detailed report
-            with open(report_path, 'w', encoding='utf-8') as f:
-                f.write("Meeting Processing Report\n")
-                f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-                
-                f.write("Summary Statistics\n")
-                f.write("-----------------\n")
-                f.write(f"Total Meetings: {len(self.results)}\n")
-                f.write(f"Matched: {sum(1 for r in self.results if r['match_status'] == 'Matched')}\n")
-                f.write(f"Posted: {sum(1 for r in self.results if r['posted'] == 'Yes')}\n\n")
-                
-                f.write("Detailed Results\n")
-                f.write("---------------\n\n")
-                
-                for result in self.results:
-                    f.write(f"Meeting: {result['meeting']}\n")
-                    f.write(f"Time: {result['time']}\n")
-                    f.write(f"Status: {result['match_status']}\n")
-                    f.write(f"Task: {result['task_title']}\n")
-                    f.write(f"Posted: {result['posted']}\n")
-                    f.write(f"Duration: {result['billable_duration']} hours\n")
-                    f.write(f"Actual Minutes: {result['actual_minutes']}\n")
-                    f.write(f"Scheduled Duration: {format_duration(result['scheduled_duration'])}\n")
-                    f.write(f"Number of Attendees: {result['attendee_count']}\n")
-                    
-                    if result['attendees']:
-                        f.write("\nAttendees:\n")
-                        for attendee in result['attendees']:
-                            f.write(f"  - {attendee['name']} ({attendee['email']})\n")
-                            f.write(f"    Duration: {format_duration(attendee['duration'])}\n")
-                            f.write(f"    Attendance: {attendee['percentage']}%\n")
-                    f.write("\n")
-            
-            print(f"Detailed report exported to: {report_path}")
-            
-        except Exception as e:
-            print(f"Error exporting results: {str(e)}")
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                if fmt == 'csv':
+                    fieldnames = list(rows[0].keys()) if rows else ['meeting']
+                    writer = csv.DictWriter(f, fieldnames=fieldnames)
+                    writer.writeheader()
+                    writer.writerows(rows)
+                else:
+                    output = {
+                        'generated': datetime.now().isoformat(timespec='seconds'),
+                        'stage_seconds': {k: round(v, 4) for k, v in self.stage_times.items()},
+                        'entries': rows
+                    }
+                    if self.aggregate:
+                        output['aggregated_entries'] = self.aggregated_entries
+                    json.dump(output, f, indent=2)
+            print(f"Proposed entries written to: {path}")
+        except OSError as e:
+            print(f"Error writing proposed entries: {str(e)}")
     
-    def run(self):
-        """Run the meeting processor."""
+    def run(self, proposed_output: Optional[str] = None, proposed_format: Optional[str] = None):
+        """Run the meeting processor.
+        
+        When proposed_output is set, the proposed time entries are also
+        written to that file (JSON or CSV).
+        """
+        self.open_export()
+        
         start_time = datetime.now()
+        run_started = time.perf_counter()
         
         try:
-            if not self.initialize():
-                return
+            with self.timed('initialize'):
+                if not self.initialize():
+                    return
             
             # Get meetings
-            meetings = self.graph_client.get_user_meetings()
+            with self.timed('calendar'):
+                meetings = self.graph_client.get_user_meetings()
             if not meetings:
                 print("No meetings found for processing.")
                 return
             
             total_meetings = len(meetings)
             
+            if self.match_meetings:
+                with self.timed('existing_entries'):
+                    self.load_existing_entries(meetings)
+            
             # Process each meeting
-            for i, meeting in enumerate(meetings, 1):
-                result = self.process_meeting(meeting)
-                self.results.append(result)
+            with self.timed('process'):
+                for meeting in meetings:
+                    self.handle_meeting(meeting)
             
-            # Show results only (export disabled)
+            if self.aggregate:
+                with self.timed('aggregate'):
+                    aggregated = self.post_aggregated_entries()
+                self.export_results(aggregated)
+            
+            if self.task_matcher.prior:
+                self.task_matcher.prior.save()
+            
+            self.close_export()
             self.show_statistics()
             
+            if proposed_output:
+                self.write_proposed_entries(proposed_output, proposed_format)
+            
+            self.show_timing(time.perf_counter() - run_started)
+            
             duration = datetime.now() - start_time
             print(f"\nTotal processing time: {duration.seconds // 60} minutes and {duration.seconds % 60} seconds")
             
         except Exception as e:
             print(f"Error in main process: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+        finally:
+            # Keep what was exported so far when the run stops early
+            self.close_export()
\ No newline at end of file
@@ -0,0 +1,177 @@
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+# Prefix for metric names in the Prometheus exposition
+METRIC_PREFIX = "meeting_tracker_"
+
+# Path segments that are IDs rather than routes (numbers, GUIDs, base64 blobs)
+ID_SEGMENT_RE = re.compile(r'^(\d+|[0-9a-fA-F-]{32,36}|[A-Za-z0-9+=_-]{40,})$')
+# Base64 online meeting IDs may themselves contain '/'
+ONLINE_MEETING_RE = re.compile(r'/onlineMeetings/.+?/attendanceReports(/[^/]+)?')
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def endpoint_label(path: str) -> str:
+    """Collapse ID segments of a URL path so endpoints make bounded labels."""
+    path = ONLINE_MEETING_RE.sub(
+        lambda m: '/onlineMeetings/{id}/attendanceReports' + ('/{id}' if m.group(1) else ''),
+        path.split('?', 1)[0]
+    )
+    segments = path.split('/')
+    return '/'.join('{id}' if ID_SEGMENT_RE.match(s) else s for s in segments) or '/'
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Metrics:
+    """Thread-safe counters and timers with JSON and Prometheus export."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, LabelKey], float] = {}
+        self.timers: Dict[Tuple[str, LabelKey], list] = {}  # [count, sum, max]
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.timers.clear()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increase a counter."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Record one duration sample."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            stats = self.timers.setdefault(key, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Record the duration of a block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def counter_value(self, name: str, **labels) -> float:
+        return self.counters.get((name, _label_key(labels)), 0)
+
+    def to_dict(self) -> Dict[str, list]:
+        """Snapshot of all samples, grouped by metric name."""
+        with self._lock:
+            counters = list(self.counters.items())
+            timers = list(self.timers.items())
+
+        snapshot = {'counters': [], 'timers': []}
+        for (name, labels), value in sorted(counters):
+            snapshot['counters'].append({'name': name, 'labels': dict(labels), 'value': value})
+        for (name, labels), (count, total, peak) in sorted(timers):
+            snapshot['timers'].append({
+                'name': name, 'labels': dict(labels),
+                'count': count, 'sum_seconds': round(total, 6), 'max_seconds': round(peak, 6)
+            })
+        return snapshot
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Render the Prometheus text exposition format (node_exporter textfile)."""
+        def render_labels(labels: Dict[str, str]) -> str:
+            if not labels:
+                return ""
+            pairs = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels.items())
+            return "{" + pairs + "}"
+
+        snapshot = self.to_dict()
+        lines = []
+        declared = set()
+
+        for sample in snapshot['counters']:
+            name = f"{METRIC_PREFIX}{sample['name']}"
+            if name not in declared:
+                lines.append(f"# TYPE {name} counter")
+                declared.add(name)
+            lines.append(f"{name}{render_labels(sample['labels'])} {sample['value']:g}")
+
+        # Timers become a summary (count/sum) plus a separate max gauge family
+        for suffix, metric_type in (('', 'summary'), ('_max', 'gauge')):
+            for sample in snapshot['timers']:
+                name = f"{METRIC_PREFIX}{sample['name']}{suffix}"
+                labels = render_labels(sample['labels'])
+                if name not in declared:
+                    lines.append(f"# TYPE {name} {metric_type}")
+                    declared.add(name)
+                if suffix:
+                    lines.append(f"{name}{labels} {sample['max_seconds']}")
+                else:
+                    lines.append(f"{name}_count{labels} {sample['count']}")
+                    lines.append(f"{name}_sum{labels} {sample['sum_seconds']}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Write metrics to path: JSON for *.json, Prometheus text otherwise.
+
+        The file is replaced atomically so a textfile collector never reads
+        a partial write.
+        """
+        content = self.to_json() if path.lower().endswith('.json') else self.to_prometheus()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+# Process-wide registry used by the clients, the matcher and the processor
+metrics = Metrics()
+
+def instrumented_session(service: str, retries: int = 3):
+    """Create a requests session that records every call in the metrics.
+
+    Idempotent requests are retried on connection errors, 429 and 5xx
+    responses; the retries are counted per endpoint.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib.parse import urlsplit
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        raise_on_status=False
+    ))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    def record(response, *args, **kwargs):
+        endpoint = endpoint_label(urlsplit(response.url).path)
+        method = response.request.method
+        metrics.inc('http_requests_total', service=service, method=method,
+                    endpoint=endpoint, status=response.status_code)
+        metrics.observe('http_request_seconds', response.elapsed.total_seconds(),
+                        service=service, method=method, endpoint=endpoint)
+        retry_state = getattr(response.raw, 'retries', None)
+        if retry_state is not None and retry_state.history:
+            metrics.inc('http_retries_total', len(retry_state.history),
+                        service=service, endpoint=endpoint)
+
+    session.hooks['response'].append(record)
+    return session
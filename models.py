@@ -0,0 +1,120 @@
+import sys
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+from utils import parse_datetime
+
+@dataclass(frozen=True, slots=True)
+class Meeting:
+    """A calendar event with only the fields the pipeline uses.
+
+    Parsed once from the Graph event payload; the raw JSON is not kept.
+    """
+    subject: str
+    start: datetime
+    end: datetime
+    body_preview: str = ""
+    join_url: Optional[str] = None
+    organizer: Optional[str] = None
+    series_id: Optional[str] = None
+    event_id: Optional[str] = None
+    is_cancelled: bool = False
+    event_type: str = "singleInstance"  # singleInstance, occurrence, exception or seriesMaster
+
+    @classmethod
+    def from_graph(cls, event: Dict[str, Any]) -> "Meeting":
+        organizer = ((event.get('organizer') or {}).get('emailAddress') or {}).get('address')
+        series_id = event.get('seriesMasterId')
+        return cls(
+            # Recurring occurrences repeat the same strings
+            subject=sys.intern(event.get('subject') or ""),
+            start=parse_datetime(event['start']['dateTime']),
+            end=parse_datetime(event['end']['dateTime']),
+            body_preview=event.get('bodyPreview') or "",
+            join_url=(event.get('onlineMeeting') or {}).get('joinUrl'),
+            organizer=sys.intern(organizer) if organizer else None,
+            series_id=sys.intern(series_id) if series_id else None,
+            event_id=event.get('id'),
+            is_cancelled=bool(event.get('isCancelled')),
+            event_type=sys.intern(event.get('type') or "singleInstance")
+        )
+
+    @property
+    def is_series_master(self) -> bool:
+        """The recurrence definition, dated to its first occurrence; not a meeting itself."""
+        return self.event_type == "seriesMaster"
+
+    @property
+    def scheduled_seconds(self) -> int:
+        return int((self.end - self.start).total_seconds())
+
+@dataclass(frozen=True, slots=True)
+class Attendee:
+    """One attendance record of a meeting occurrence."""
+    name: str
+    email: str
+    duration: int  # Seconds attended
+    role: Optional[str] = None
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "Attendee":
+        """Build from a Graph attendanceRecord."""
+        return cls(
+            name=(record.get('identity') or {}).get('displayName', 'Unknown User'),
+            email=record.get('emailAddress', 'No Email'),
+            duration=record['totalAttendanceInSeconds'],
+            role=record.get('role')
+        )
+
+@dataclass(frozen=True, slots=True)
+class AttendanceStats:
+    attendee_count: int
+    avg_attendance: float  # Percent of the scheduled duration
+    max_duration: int  # Seconds
+
+    @classmethod
+    def compute(cls, attendees: Iterable[Attendee], scheduled_seconds: int) -> "AttendanceStats":
+        """Count, average attendance and longest duration in one pass."""
+        count, total_percentage, max_duration = 0, 0.0, None
+        for attendee in attendees:
+            count += 1
+            total_percentage += attendee.duration / scheduled_seconds * 100 if scheduled_seconds else 0
+            if max_duration is None or attendee.duration > max_duration:
+                max_duration = attendee.duration
+        return cls(
+            attendee_count=count,
+            avg_attendance=total_percentage / count if count else 0,
+            max_duration=scheduled_seconds if max_duration is None else max_duration
+        )
+
+@dataclass(slots=True)
+class TaskContext:
+    """Match words of an Intervals task; usage_count grows as entries are confirmed."""
+    task_id: str
+    title_words: Tuple[str, ...] = ()
+    project_name: str = ""
+    module_name: str = ""
+    keywords: FrozenSet[str] = frozenset()
+    usage_count: int = 0
+
+@dataclass(slots=True)
+class MatchResult:
+    """Outcome of processing one meeting."""
+    meeting: str  # Subject
+    time: str  # Start, 'YYYY-MM-DD HH:MM'
+    task_id: str
+    task_title: str
+    match_status: str
+    posted: str
+    billable_duration: float
+    duration: int  # Seconds attended
+    actual_minutes: int
+    scheduled_duration: int
+    match_method: str = ""
+    organizer: Optional[str] = None
+    series_id: Optional[str] = None
+    time_entry: Optional[Dict[str, Any]] = None
+    latency_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
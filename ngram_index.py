@@ -0,0 +1,118 @@
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Set, Tuple
+
+# Minimum similarity for a subject word to count as a keyword hit
+MIN_SIMILARITY = 0.6
+# Similarity given to abbreviations: prefixes ("infra") and numeronyms ("k8s")
+ABBREVIATION_SIMILARITY = 0.9
+# Shortest prefix accepted as an abbreviation
+MIN_PREFIX_LENGTH = 4
+# Query words whose similar keywords are kept once trim_cache runs
+SIMILAR_CACHE_SIZE = 4096
+
+NUMERONYM_RE = re.compile(r'^([a-z])(\d{1,2})([a-z])$')
+
+def trigrams(word: str) -> Set[str]:
+    """Character trigrams of a word, padded so prefixes and suffixes count."""
+    padded = f"^{word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class NgramIndex:
+    """Character trigram index over task keywords for approximate lookup.
+
+    Each keyword is indexed once. A query word is compared only with the
+    keywords that share at least two trigrams with it (or one for very short
+    words), so a lookup touches a handful of candidates instead of every
+    keyword of every task.
+    """
+
+    def __init__(self):
+        self.words: List[str] = []
+        self.word_grams: List[Set[str]] = []
+        self.word_tasks: List[Set[str]] = []
+        self.word_ids: Dict[str, int] = {}
+        self.postings: Dict[str, List[int]] = {}
+        self.numeronyms: Dict[Tuple[str, int, str], List[int]] = {}
+        self._similar_cache: Dict[str, Tuple[Tuple[int, float], ...]] = {}
+
+    @classmethod
+    def build(cls, task_keywords: Dict[str, Iterable[str]]) -> "NgramIndex":
+        """Build the index from {task_id: keywords}."""
+        index = cls()
+        for task_id, keywords in task_keywords.items():
+            for word in keywords:
+                index.add(word, task_id)
+        return index
+
+    def add(self, word: str, task_id: str):
+        word_id = self.word_ids.get(word)
+        if word_id is None:
+            word_id = len(self.words)
+            self.word_ids[word] = word_id
+            self.words.append(word)
+            grams = trigrams(word)
+            self.word_grams.append(grams)
+            self.word_tasks.append(set())
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(word_id)
+            self.numeronyms.setdefault((word[0], len(word) - 2, word[-1]), []).append(word_id)
+        self.word_tasks[word_id].add(task_id)
+        self._similar_cache.clear()
+
+    def trim_cache(self):
+        """Forget the cached lookups once there are more than SIMILAR_CACHE_SIZE."""
+        if len(self._similar_cache) > SIMILAR_CACHE_SIZE:
+            self._similar_cache.clear()
+
+    def similar(self, query: str) -> Tuple[Tuple[int, float], ...]:
+        """(word_id, similarity) of keywords similar to query, best first."""
+        cached = self._similar_cache.get(query)
+        if cached is not None:
+            return cached
+
+        scores = {}
+        exact = self.word_ids.get(query)
+        if exact is not None:
+            scores[exact] = 1.0
+
+        # Numeronyms: k8s -> k + 8 letters + s
+        numeronym = NUMERONYM_RE.match(query)
+        if numeronym:
+            key = (numeronym.group(1), int(numeronym.group(2)), numeronym.group(3))
+            for word_id in self.numeronyms.get(key, ()):
+                scores[word_id] = max(scores.get(word_id, 0.0), ABBREVIATION_SIMILARITY)
+
+        # Candidate pruning: count shared trigrams through the postings
+        query_grams = trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self.postings.get(gram, ()))
+        min_shared = 1 if len(query_grams) <= 3 else 2
+
+        for word_id, common in shared.items():
+            if common < min_shared or word_id in scores:
+                continue
+            word = self.words[word_id]
+            dice = 2 * common / (len(query_grams) + len(self.word_grams[word_id]))
+            if len(query) >= MIN_PREFIX_LENGTH and word.startswith(query):
+                dice = max(dice, ABBREVIATION_SIMILARITY)
+            if dice >= MIN_SIMILARITY:
+                scores[word_id] = dice
+
+        result = tuple(sorted(scores.items(), key=lambda item: -item[1]))
+        self._similar_cache[query] = result
+        return result
+
+    def task_scores(self, query_words: Iterable[str]) -> Dict[str, float]:
+        """Sum, per task, the best similarity of each query word to its keywords."""
+        totals: Dict[str, float] = {}
+        for query in query_words:
+            best: Dict[str, float] = {}
+            for word_id, similarity in self.similar(query):
+                for task_id in self.word_tasks[word_id]:
+                    if similarity > best.get(task_id, 0.0):
+                        best[task_id] = similarity
+            for task_id, similarity in best.items():
+                totals[task_id] = totals.get(task_id, 0.0) + similarity
+        return totals
@@ -0,0 +1,103 @@
+import json
+import queue
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple, Optional
+from metrics import metrics
+
+class Notification(NamedTuple):
+    change_type: str  # created, updated, deleted, or a lifecycle event
+    event_id: Optional[str]
+    subscription_id: Optional[str]
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: bytes = b"", content_type: str = "text/plain"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        receiver = self.server.receiver
+        parsed = urllib.parse.urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+
+        # Subscription validation: echo the token as plain text within 10 s
+        token = urllib.parse.parse_qs(parsed.query).get('validationToken')
+        if token:
+            self._reply(200, token[0].encode('utf-8'))
+            return
+
+        if parsed.path != receiver.path:
+            self._reply(404)
+            return
+
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            self._reply(400)
+            return
+
+        # Acknowledge first; the watcher does the work off the request thread
+        self._reply(202)
+        for item in payload.get('value', []):
+            receiver.accept(item)
+
+class NotificationReceiver:
+    """Local HTTP endpoint for Microsoft Graph change notifications.
+
+    Graph must reach it through a public HTTPS URL (a reverse proxy or
+    tunnel forwarding to host:port). Notifications with the wrong
+    clientState are dropped; accepted ones are queued as Notification
+    tuples for the watcher.
+    """
+
+    def __init__(self, client_state: str, host: str = "127.0.0.1", port: int = 0,
+                 path: str = "/notifications"):
+        self.client_state = client_state
+        self.path = path
+        self.queue: "queue.Queue[Notification]" = queue.Queue()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.receiver = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Local URL of the endpoint."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{self.path}"
+
+    def accept(self, item: dict):
+        if item.get('clientState') != self.client_state:
+            metrics.inc('notifications_total', kind='rejected')
+            return
+
+        if item.get('lifecycleEvent'):
+            # reauthorizationRequired, subscriptionRemoved, missed
+            change_type, event_id = item['lifecycleEvent'], None
+        else:
+            change_type = item.get('changeType', 'updated')
+            event_id = (item.get('resourceData') or {}).get('id')
+            if not event_id and item.get('resource'):
+                event_id = item['resource'].rstrip('/').rsplit('/', 1)[-1]
+        metrics.inc('notifications_total', kind=change_type)
+        self.queue.put(Notification(change_type, event_id, item.get('subscriptionId')))
+
+    def start(self) -> "NotificationReceiver":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
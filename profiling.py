@@ -0,0 +1,202 @@
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+# Hot functions listed in the summary
+TOP_FUNCTIONS = 25
+# One cProfile per thread; from Python 3.12 only one can be active at a time
+PROFILE_THREADS = sys.version_info < (3, 12)
+
+FrameKey = Tuple[str, str, int]  # (file, function, first line)
+# Pseudo file name of the root frame naming the sampled thread
+THREAD_FRAME = "<thread>"
+
+def frame_label(key: FrameKey) -> str:
+    filename, name, line = key
+    if filename == THREAD_FRAME:
+        return f"thread {name}"
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+class StackSampler:
+    """Sample call stacks at a fixed interval.
+
+    Samples are wall-clock based, so time spent waiting on HTTP calls shows
+    up as well as CPU time. Every thread is sampled unless thread_id picks
+    one; each stack then starts with a frame naming its thread. Identical
+    stacks are counted once with the summed seconds.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id  # None: all threads
+        self.interval = interval
+        self.stacks: Counter = Counter()  # Tuple of FrameKey, root first -> seconds
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> "StackSampler":
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            frames = sys._current_frames()
+            if self.thread_id is not None:
+                frame = frames.get(self.thread_id)
+                if frame is None:
+                    break
+                self.stacks[self._stack(frame)] += now - last
+            else:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in frames.items():
+                    if thread_id == own_id:
+                        continue
+                    root = (THREAD_FRAME, names.get(thread_id, str(thread_id)), 0)
+                    self.stacks[(root,) + self._stack(frame)] += now - last
+            self.samples += 1
+            last = now
+
+    @staticmethod
+    def _stack(frame) -> Tuple[FrameKey, ...]:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_name, code.co_firstlineno))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def write_collapsed(self, path: str):
+        """Folded stacks ("root;child;leaf seconds-in-ms") for flamegraph.pl and speedscope."""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, seconds in self.stacks.most_common():
+                f.write(f"{';'.join(frame_label(key) for key in stack)} {max(1, round(seconds * 1000))}\n")
+
+    def write_speedscope(self, path: str, name: str):
+        """Speedscope "sampled" profile; open it at https://www.speedscope.app."""
+        frames: List[Dict[str, Any]] = []
+        frame_ids: Dict[FrameKey, int] = {}
+        samples, weights = [], []
+        for stack, seconds in self.stacks.items():
+            ids = []
+            for key in stack:
+                if key not in frame_ids:
+                    frame_ids[key] = len(frames)
+                    frames.append({'name': key[1], 'file': key[0], 'line': key[2]})
+                ids.append(frame_ids[key])
+            samples.append(ids)
+            weights.append(round(seconds, 6))
+
+        document = {
+            '$schema': "https://www.speedscope.app/file-format-schema.json",
+            'name': name,
+            'exporter': "meeting-tracker profiling",
+            'activeProfileIndex': 0,
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': round(sum(weights), 6),
+                'samples': samples,
+                'weights': weights,
+            }],
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(document, f)
+
+def top_functions(stats: pstats.Stats, sort: str, top: int) -> List[str]:
+    """Table rows of the top functions by 'tottime' or 'cumtime'."""
+    column = 2 if sort == 'tottime' else 3
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][column], reverse=True)[:top]
+    lines = [f"{'calls':>10} {'self s':>9} {'total s':>9}  function"]
+    for (filename, line, name), (_, calls, self_time, total_time, _) in rows:
+        lines.append(f"{calls:>10} {self_time:9.3f} {total_time:9.3f}  {frame_label((filename, name, line))}")
+    return lines
+
+def profile_call(func: Callable[[], Any], prefix: str, top: int = TOP_FUNCTIONS,
+                 interval: float = SAMPLE_INTERVAL) -> Any:
+    """Run func under cProfile and the stack sampler, then write the profiles.
+
+    Threads started by func (the backfill workers, the notification
+    receiver) are sampled too and, before Python 3.12, get their own
+    cProfile whose statistics are merged. From 3.12 only one cProfile can
+    be active at a time, so other threads are covered by the sampler only. Writes <prefix>.pstats (cProfile, for pstats/snakeviz),
+    <prefix>.collapsed.txt (folded stacks), <prefix>.speedscope.json and
+    <prefix>.top.txt, a summary of the hottest functions that is also
+    printed. The files are written even when func raises.
+    """
+    profilers = [cProfile.Profile()]
+
+    def profile_thread(*_):
+        # First event in a new thread: hand the thread to its own profiler
+        sys.setprofile(None)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active (Python 3.12+)
+            return
+        profilers.append(profiler)
+
+    sampler = StackSampler(interval=interval).start()
+    started = time.perf_counter()
+    if PROFILE_THREADS:
+        threading.setprofile(profile_thread)
+    profilers[0].enable()
+    try:
+        return func()
+    finally:
+        profilers[0].disable()
+        if PROFILE_THREADS:
+            threading.setprofile(None)
+        sampler.stop()
+        wall_seconds = time.perf_counter() - started
+        write_profiles(profilers, sampler, prefix, top, wall_seconds)
+
+def write_profiles(profilers: List[cProfile.Profile], sampler: StackSampler, prefix: str,
+                   top: int, wall_seconds: float):
+    directory = os.path.dirname(prefix)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    stats = pstats.Stats(*profilers)
+    stats.dump_stats(f"{prefix}.pstats")
+    sampler.write_collapsed(f"{prefix}.collapsed.txt")
+    sampler.write_speedscope(f"{prefix}.speedscope.json", os.path.basename(prefix))
+
+    summary = [
+        f"Profile of {os.path.basename(prefix)}: {wall_seconds:.2f} s wall, "
+        f"{sampler.samples} stack samples, {len(profilers)} thread(s) profiled",
+        "",
+        f"Top {top} functions by total time (including callees):",
+        *top_functions(stats, 'cumtime', top),
+        "",
+        f"Top {top} functions by self time:",
+        *top_functions(stats, 'tottime', top),
+    ]
+    with open(f"{prefix}.top.txt", 'w', encoding='utf-8') as f:
+        f.write("\n".join(summary) + "\n")
+
+    print("\n=== Profile ===")
+    print("\n".join(summary[:4 + min(top, 15)]))
+    print(f"\nProfile written to: {prefix}.pstats, {prefix}.collapsed.txt, "
+          f"{prefix}.speedscope.json, {prefix}.top.txt")
@@ -0,0 +1,187 @@
+import csv
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+from models import MatchResult
+
+# Export columns and their Parquet types, one row per processed meeting
+EXPORT_COLUMNS = (
+    ('date', 'string'),
+    ('time', 'string'),
+    ('meeting', 'string'),
+    ('organizer', 'string'),
+    ('series_id', 'string'),
+    ('match_status', 'string'),
+    ('match_method', 'string'),
+    ('task_id', 'string'),
+    ('task_title', 'string'),
+    ('project_id', 'string'),
+    ('posted', 'string'),
+    ('billable_hours', 'float64'),
+    ('duration_seconds', 'int64'),
+    ('actual_minutes', 'int64'),
+    ('scheduled_seconds', 'int64'),
+    ('latency_ms', 'float64'),
+)
+EXPORT_FORMATS = ('csv', 'jsonl', 'parquet')
+
+# Rows buffered per Parquet row group
+PARQUET_BATCH_SIZE = 5000
+
+def export_row(result: MatchResult) -> Dict[str, Any]:
+    """Flatten a result into the export columns."""
+    entry = result.time_entry or {}
+    project_id = entry.get('projectid')
+    return {
+        'date': result.time[:10],
+        'time': result.time,
+        'meeting': result.meeting,
+        'organizer': result.organizer,
+        'series_id': result.series_id,
+        'match_status': result.match_status,
+        'match_method': result.match_method,
+        'task_id': str(result.task_id),
+        'task_title': result.task_title,
+        'project_id': str(project_id) if project_id is not None else None,
+        'posted': result.posted,
+        'billable_hours': float(result.billable_duration),
+        'duration_seconds': int(result.duration),
+        'actual_minutes': int(result.actual_minutes),
+        'scheduled_seconds': int(result.scheduled_duration),
+        'latency_ms': round(result.latency_ms, 3)
+    }
+
+class ResultWriter(ABC):
+    """Stream results to a file as they are produced.
+
+    Rows are written (or, for Parquet, flushed per row group) as they
+    arrive, so memory does not grow with the number of meetings. write()
+    may be called from several threads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self._lock = threading.Lock()
+
+    def write(self, result: MatchResult):
+        row = export_row(result)
+        with self._lock:
+            self.write_row(row)
+            self.rows += 1
+
+    @abstractmethod
+    def write_row(self, row: Dict[str, Any]):
+        """Write one export row; called with the lock held."""
+
+    @abstractmethod
+    def close(self):
+        """Flush and close the file."""
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class CsvResultWriter(ResultWriter):
+    def __init__(self, path: str, append: bool = False):
+        super().__init__(path)
+        has_rows = append and os.path.exists(path) and os.path.getsize(path) > 0
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=[name for name, _ in EXPORT_COLUMNS])
+        if not has_rows:
+            self.writer.writeheader()
+
+    def write_row(self, row: Dict[str, Any]):
+        self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+class JsonlResultWriter(ResultWriter):
+    def __init__(self, path: str, append: bool = False):
+        super().__init__(path)
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def write_row(self, row: Dict[str, Any]):
+        self.file.write(json.dumps(row, ensure_ascii=False))
+        self.file.write('\n')
+
+    def close(self):
+        self.file.close()
+
+class ParquetResultWriter(ResultWriter):
+    """Parquet output through pyarrow, one row group per batch of rows."""
+
+    def __init__(self, path: str, batch_size: int = PARQUET_BATCH_SIZE):
+        super().__init__(path)
+        try:
+            # Optional dependency, only needed for Parquet output
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+        self.pa = pyarrow
+        self.schema = pyarrow.schema([(name, getattr(pyarrow, kind)()) for name, kind in EXPORT_COLUMNS])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        self.batch_size = batch_size
+        self.batch = {name: [] for name, _ in EXPORT_COLUMNS}
+        self.pending = 0
+
+    def write_row(self, row: Dict[str, Any]):
+        for name, values in self.batch.items():
+            values.append(row[name])
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        self.writer.write_table(self.pa.Table.from_pydict(self.batch, schema=self.schema))
+        for values in self.batch.values():
+            values.clear()
+        self.pending = 0
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.writer.close()
+
+def export_format(path: str, fmt: Optional[str] = None) -> str:
+    """The export format: fmt if given, else from the file extension (default csv)."""
+    if fmt:
+        return fmt
+    extension = path.rsplit('.', 1)[-1].lower() if '.' in path else ''
+    return {'jsonl': 'jsonl', 'ndjson': 'jsonl', 'parquet': 'parquet', 'pq': 'parquet'}.get(extension, 'csv')
+
+def next_part_path(path: str) -> str:
+    """The first free <name>.part<N><ext> next to path."""
+    base, extension = os.path.splitext(path)
+    number = 1
+    while os.path.exists(f"{base}.part{number}{extension}"):
+        number += 1
+    return f"{base}.part{number}{extension}"
+
+def open_result_writer(path: str, fmt: Optional[str] = None, append: bool = False) -> ResultWriter:
+    """Open a streaming writer for path in the given (or inferred) format.
+
+    append=True adds to an existing CSV or JSONL file. Parquet files
+    cannot be appended to, so the rows then go to a new part file next to
+    the existing one (results.part1.parquet, ...); read them together with
+    pyarrow.dataset or pandas.read_parquet on a list of the files.
+    """
+    fmt = export_format(path, fmt)
+    if fmt == 'parquet':
+        if append and os.path.exists(path):
+            path = next_part_path(path)
+            print(f"Appending to a Parquet export is not possible; this run exports to {path}")
+        return ParquetResultWriter(path)
+    if fmt == 'jsonl':
+        return JsonlResultWriter(path, append)
+    return CsvResultWriter(path, append)
@@ -1,86 +1,205 @@
-import requests
-from typing import Dict, List, Optional, Any
-from config import AZURE_OPENAI_KEY, AZURE_OPENAI_ENDPOINT
+import json
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Tuple
+from config import (
+    AZURE_OPENAI_KEY, AZURE_OPENAI_ENDPOINT,
+    LLM_PRICE_INPUT, LLM_PRICE_CACHED_INPUT, LLM_PRICE_OUTPUT
+)
 from utils import clean_text
+from text_utils import tokenize
+from metrics import metrics, instrumented_session
+from task_prior import TaskPrior
+from ngram_index import NgramIndex
+from models import TaskContext
+
+# Lowest similarity accepted when a single title word is recognised: an
+# exact keyword, a prefix or a numeronym, not merely a similar spelling
+SINGLE_WORD_SIMILARITY = 0.8
+# AI answers kept for repeated subjects once trim_caches runs (watch mode)
+AI_CACHE_SIZE = 2048
+
+# Fixed part of the matching prompt. It comes first, followed by the task
+# catalogue and only then the meeting title, so that every request shares
+# the same prefix and Azure OpenAI can serve it from its prompt cache.
+MATCH_INSTRUCTIONS = """You are a task matcher focusing on title keywords and project context.
+Match the meeting title in the user message with the most relevant task below.
+
+Instructions:
+1. Match based on meeting title and task titles/keywords
+2. Look for direct keyword matches first
+3. Consider project context
+4. For infrastructure/network meetings, prefer infrastructure tasks
+5. For client-specific meetings, match to respective tasks
+
+Respond with a JSON object:
+{
+  "taskId": "numeric_id_or_NO_MATCH",
+  "confidence": "high|medium|low"
+}
+
+Available Tasks:
+"""
+
+class LlmUsage:
+    """Tokens and estimated cost of the AI matching requests, with optional limits.
+    
+    The budget is checked before each request, so concurrent requests may
+    overshoot it by the size of the requests in flight.
+    """
+    
+    def __init__(self, token_budget: Optional[int] = None, cost_budget: Optional[float] = None):
+        self.token_budget = token_budget
+        self.cost_budget = cost_budget  # USD
+        self.requests = 0
+        self.prompt_tokens = 0  # Including the cached ones
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+    
+    def record(self, usage: Dict[str, Any]):
+        """Add the usage block of a chat completion response."""
+        prompt = int(usage.get('prompt_tokens') or 0)
+        cached = int((usage.get('prompt_tokens_details') or {}).get('cached_tokens') or 0)
+        completion = int(usage.get('completion_tokens') or 0)
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt
+            self.cached_tokens += cached
+            self.completion_tokens += completion
+        metrics.inc('llm_tokens_total', prompt - cached, kind='prompt')
+        metrics.inc('llm_tokens_total', cached, kind='cached')
+        metrics.inc('llm_tokens_total', completion, kind='completion')
+    
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+    
+    @property
+    def cost(self) -> float:
+        """Estimated cost in USD."""
+        return (
+            (self.prompt_tokens - self.cached_tokens) * LLM_PRICE_INPUT
+            + self.cached_tokens * LLM_PRICE_CACHED_INPUT
+            + self.completion_tokens * LLM_PRICE_OUTPUT
+        ) / 1_000_000
+    
+    def exhausted(self) -> bool:
+        return (
+            (self.token_budget is not None and self.total_tokens >= self.token_budget)
+            or (self.cost_budget is not None and self.cost >= self.cost_budget)
+        )
+    
+    def summary(self) -> str:
+        cached_share = self.cached_tokens / self.prompt_tokens * 100 if self.prompt_tokens else 0
+        return (
+            f"{self.requests} requests, {self.prompt_tokens} prompt tokens "
+            f"({round(cached_share, 1)}% cached), {self.completion_tokens} completion tokens, "
+            f"~${self.cost:.4f}"
+        )
 
 class TaskMatcher:
-    def __init__(self):
-        self.task_context = {}
+    def __init__(self, endpoint: str = AZURE_OPENAI_ENDPOINT, api_key: str = AZURE_OPENAI_KEY,
+                 prior: Optional[TaskPrior] = None, usage: Optional[LlmUsage] = None):
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.prior = prior  # Learned pairings from earlier posted entries
+        self.usage = usage or LlmUsage()  # AI matching tokens, cost and budget
+        self.task_context: Dict[str, TaskContext] = {}
+        self.fuzzy_index = None  # Trigram index over task keywords
+        self.system_prompt = None  # Instructions and task catalogue, built with the context
+        self.session = instrumented_session('openai')
+        self.ai_cache = {}  # Cleaned subject -> AI answer, reused for repeated subjects
     
-    def build_task_context(self, tasks: List[Dict[str, Any]], intervals_client) -> Dict[str, Dict]:
+    def trim_caches(self):
+        """Bound the caches that grow with every new subject, for long-running watch mode."""
+        # Dicts keep insertion order: the oldest answers go first
+        for key in list(self.ai_cache)[:len(self.ai_cache) - AI_CACHE_SIZE]:
+            del self.ai_cache[key]
+        if self.fuzzy_index is not None:
+            self.fuzzy_index.trim_cache()
+    
+    def build_task_context(self, tasks: List[Dict[str, Any]], intervals_client) -> Dict[str, TaskContext]:
         """Build context for task matching."""
         print("Building task context...")
         task_context = {}
+        usage = self.prior.task_usage() if self.prior else {}
         
         for task in tasks:
             print(f"  Processing: {task['title']}")
             task_id = task['id']
             
-            task_context[task_id] = {
-                'title_words': [],
-                'project_name': "",
-                'module_name': "",
-                'keywords': [],
-                'usage_count': 0
-            }
-            
             # Process title
-            clean_title = clean_text(task['title'], remove_emoji=True)
-            title_words = [
-                word.lower() for word in clean_title.split()
-                if len(word) > 2 and not word.isdigit()
-            ]
-            
-            task_context[task_id]['title_words'] = title_words
-            task_context[task_id]['keywords'].extend(title_words)
+            title_words = tokenize(task['title'])
+            keywords = set(title_words)
+            project_name = ""
             
             # Add project context
             try:
                 if task.get('projectid'):
                     project_info = intervals_client.get_project(task['projectid'])
                     if project_info and project_info.get('name'):
-                        task_context[task_id]['project_name'] = project_info['name']
-                        
-                        project_words = clean_text(project_info['name'], remove_emoji=True)
-                        project_words = [
-                            word.lower() for word in project_words.split()
-                            if len(word) > 2 and not word.isdigit()
-                        ]
-                        task_context[task_id]['keywords'].extend(project_words)
+                        project_name = project_info['name']
+                        keywords.update(tokenize(project_name))
             except Exception as e:
                 print(f"    Unable to fetch project info for task {task_id}: {str(e)}")
             
-            # Remove duplicates from keywords
-            task_context[task_id]['keywords'] = list(set(task_context[task_id]['keywords']))
+            task_context[task_id] = TaskContext(
+                task_id=task_id,
+                title_words=title_words,
+                project_name=project_name,
+                keywords=frozenset(keywords),
+                usage_count=usage.get(str(task_id), 0)
+            )
         
         self.task_context = task_context
+        self.fuzzy_index = NgramIndex.build({
+            task_id: context.keywords for task_id, context in task_context.items()
+        })
+        self.system_prompt = self.build_system_prompt(tasks)
         return task_context
     
+    def build_system_prompt(self, tasks: List[Dict[str, Any]]) -> str:
+        """Instructions plus the task catalogue, identical for every meeting.
+        
+        Tasks are sorted by ID and keywords alphabetically, so the prompt
+        only changes when the tasks do.
+        """
+        catalogue = "\n".join(
+            f"Task ID: {task['id']}\n"
+            f"Title: {task['title']}\n"
+            f"Project: {self.task_context[task['id']].project_name}\n"
+            f"Keywords: {', '.join(sorted(self.task_context[task['id']].keywords))}\n"
+            for task in sorted(tasks, key=lambda task: str(task['id']))
+        )
+        return MATCH_INSTRUCTIONS + catalogue
+    
     def direct_match(self, meeting_title: str, tasks: List[Dict[str, Any]]) -> Optional[str]:
         """Find direct keyword matches between meeting title and tasks."""
-        clean_title = clean_text(meeting_title, remove_emoji=True)
-        title_words = [
-            word.lower() for word in clean_title.split()
-            if len(word) > 2 and not word.isdigit()
-        ]
+        title_words = tokenize(meeting_title)
         
         best_match = {
             'task_id': None,
-            'score': 0
+            'score': 0,
+            'usage_count': 0
         }
         
         for task in tasks:
             task_id = task['id']
-            task_keywords = self.task_context[task_id]['keywords']
+            context = self.task_context[task_id]
+            task_keywords = context.keywords
+            usage_count = context.usage_count
             
             match_count = sum(1 for word in title_words if word in task_keywords)
             
             if title_words:
                 score = match_count / len(title_words)
                 
-                if score > best_match['score']:
+                # Equal scores go to the task used most often before
+                if (score, usage_count) > (best_match['score'], best_match['usage_count']):
                     best_match['task_id'] = task_id
                     best_match['score'] = score
+                    best_match['usage_count'] = usage_count
         
         if best_match['score'] > 0.5:
             print(f"Direct match found (Score: {round(best_match['score'], 2)})")
@@ -88,79 +207,172 @@ class TaskMatcher:
         
         return None
     
-    def ai_match(self, meeting_subject: str, tasks: List[Dict[str, Any]]) -> Optional[str]:
-        """Use Azure OpenAI to match meeting to task."""
-        clean_subject = clean_text(meeting_subject, remove_emoji=True)
+    def fuzzy_match(self, meeting_title: str, tasks: List[Dict[str, Any]]) -> Optional[str]:
+        """Find approximate keyword matches (typos, abbreviations, "k8s")."""
+        title_words = tokenize(meeting_title)
+        if not title_words or self.fuzzy_index is None:
+            return None
         
-        # Build task analysis string
-        task_analysis = "\n".join([
-            f"Task ID: {task['id']}\n"
-            f"Title: {task['title']}\n"
-            f"Project: {self.task_context[task['id']]['project_name']}\n"
-            f"Keywords: {', '.join(self.task_context[task['id']]['keywords'])}\n"
-            for task in tasks
-        ])
+        # Words no keyword resembles ("sync", "call") do not dilute the
+        # score, as long as most of the title is recognised
+        similarities = [found[0][1] for found in map(self.fuzzy_index.similar, title_words) if found]
+        known_words = len(similarities)
+        if known_words * 2 <= len(title_words):
+            return None
+        if known_words == 1 and similarities[0] < SINGLE_WORD_SIMILARITY:
+            return None
         
-        prompt = f"""
-Match this meeting title with the most relevant task.
-
-Meeting Title: {clean_subject}
-
-Available Tasks:
-{task_analysis}
-
-Instructions:
-1. Match based on meeting title and task titles/keywords
-2. Look for direct keyword matches first
-3. Consider project context
-4. For infrastructure/network meetings, prefer infrastructure tasks
-5. For client-specific meetings, match to respective tasks
-
-Response format:
-{{
-  "taskId": "numeric_id_or_NO_MATCH",
-  "confidence": "high|medium|low"
-}}
-"""
+        task_ids = {task['id'] for task in tasks}
+        best_task_id, best_key = None, (0.0, 0)
+        for task_id, total in self.fuzzy_index.task_scores(title_words).items():
+            if task_id not in task_ids:
+                continue
+            key = (total / known_words, self.task_context[task_id].usage_count)
+            if key > best_key:
+                best_task_id, best_key = task_id, key
+        
+        if best_key[0] > 0.5:
+            print(f"Fuzzy match found (Score: {round(best_key[0], 2)})")
+            return best_task_id
+        
+        return None
+    
+    def prior_match(self, meeting_subject: str, tasks: List[Dict[str, Any]],
+                    organizer: Optional[str] = None, series_id: Optional[str] = None,
+                    when: Optional[datetime] = None) -> Optional[str]:
+        """Find the task this meeting was confirmed for in earlier runs.
+        
+        Confirmations are weighted by their age at when, the meeting start,
+        so that backfilled meetings are judged by the pairings of their time.
+        """
+        if not self.prior:
+            return None
+        
+        task_ids = {str(task['id']): task['id'] for task in tasks}
+        found = self.prior.lookup(meeting_subject, organizer, series_id, task_ids, when)
+        if not found:
+            return None
+        
+        task_id, level = found
+        print(f"Prior match found (by {level})")
+        return task_ids[task_id]
+    
+    def record_confirmed(self, meeting_subject: str, organizer: Optional[str], series_id: Optional[str],
+                         task_id: str, when: datetime):
+        """Learn from a meeting whose time entry is in Intervals."""
+        if task_id in self.task_context:
+            self.task_context[task_id].usage_count += 1
+        if self.prior:
+            self.prior.record(meeting_subject, organizer, series_id, task_id, when)
+    
+    def match(self, meeting_subject: str, tasks: List[Dict[str, Any]],
+              organizer: Optional[str] = None, series_id: Optional[str] = None,
+              when: Optional[datetime] = None) -> Tuple[Optional[str], str]:
+        """Run the matching cascade and return (task_id, stage).
+        
+        The stage is 'prior', 'direct', 'fuzzy', 'cache' or 'llm' for a hit and 'none'
+        when no task matched. task_id is None when nothing matched. when is the
+        meeting start, at which earlier confirmations are weighed.
+        """
+        with metrics.timer('match_stage_seconds', stage='prior'):
+            task_id = self.prior_match(meeting_subject, tasks, organizer, series_id, when)
+        if task_id:
+            return self._match_hit(task_id, 'prior')
+        
+        with metrics.timer('match_stage_seconds', stage='direct'):
+            task_id = self.direct_match(meeting_subject, tasks)
+        if task_id:
+            return self._match_hit(task_id, 'direct')
+        
+        with metrics.timer('match_stage_seconds', stage='fuzzy'):
+            task_id = self.fuzzy_match(meeting_subject, tasks)
+        if task_id:
+            return self._match_hit(task_id, 'fuzzy')
+        
+        cache_key = clean_text(meeting_subject, remove_emoji=True)
+        if cache_key in self.ai_cache:
+            task_id = self.ai_cache[cache_key]
+            if task_id != "NO_MATCH":
+                print("AI match reused from earlier meeting with the same subject")
+                return self._match_hit(task_id, 'cache')
+            return self._match_miss()
+        
+        if self.usage.exhausted():
+            # Keep the local matches only for the rest of the run
+            print("AI matching skipped - LLM budget exhausted")
+            metrics.inc('llm_skipped_total', reason='budget')
+            return self._match_miss()
+        
+        with metrics.timer('match_stage_seconds', stage='llm'):
+            task_id = self.ai_match(meeting_subject, tasks)
+        if task_id is None:
+            # Request failed; do not cache so the next occurrence retries
+            metrics.inc('llm_errors_total')
+            return self._match_miss()
+        
+        self.ai_cache[cache_key] = task_id
+        if task_id == "NO_MATCH":
+            return self._match_miss()
+        return self._match_hit(task_id, 'llm')
+    
+    def _match_hit(self, task_id: str, stage: str) -> Tuple[str, str]:
+        metrics.inc('match_hits_total', stage=stage)
+        return task_id, stage
+    
+    def _match_miss(self) -> Tuple[None, str]:
+        metrics.inc('match_misses_total')
+        return None, 'none'
+    
+    def ai_match(self, meeting_subject: str, tasks: List[Dict[str, Any]]) -> Optional[str]:
+        """Use Azure OpenAI to match meeting to task.
+        
+        Returns the task ID, "NO_MATCH" (also for low confidence answers),
+        or None when the request failed.
+        """
+        clean_subject = clean_text(meeting_subject, remove_emoji=True)
+        system_prompt = self.system_prompt or self.build_system_prompt(tasks)
         
         try:
             headers = {
-                "api-key": AZURE_OPENAI_KEY,
+                "api-key": self.api_key,
                 "Content-Type": "application/json"
             }
             
+            # The meeting title goes last so the system prompt stays a cacheable prefix
             body = {
                 "messages": [
                     {
                         "role": "system",
-                        "content": "You are a task matcher focusing on title keywords and project context."
+                        "content": system_prompt
                     },
                     {
                         "role": "user",
-                        "content": prompt
+                        "content": f"Meeting Title: {clean_subject}"
                     }
                 ],
                 "temperature": 0.3,
-                "max_tokens": 100
+                "max_tokens": 100,
+                "response_format": {"type": "json_object"}
             }
             
-            response = requests.post(
-                AZURE_OPENAI_ENDPOINT,
+            response = self.session.post(
+                self.endpoint,
                 headers=headers,
                 json=body
             )
             response.raise_for_status()
             
             result = response.json()
+            self.usage.record(result.get("usage") or {})
             match_result = result["choices"][0]["message"]["content"]
-            match_data = eval(match_result)  # Safe in this context as we control the input
+            match_data = json.loads(match_result)
             
             print(f"AI Match Result:")
             print(f"  Task ID: {match_data['taskId']}")
             print(f"  Confidence: {match_data['confidence']}")
             
             if match_data['confidence'] == "low":
-                return None
+                return "NO_MATCH"
                 
             return match_data['taskId']
             
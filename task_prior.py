@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from text_utils import tokenize
+
+# Weight of a confirmation halves every HALF_LIFE_DAYS
+HALF_LIFE_DAYS = 45
+# Minimum share of the weight the best task needs among a key's candidates
+MIN_SHARE = 0.6
+# Minimum weight per key level: a series or subject+organizer pairing is
+# trusted after one confirmation, a bare subject after two
+MIN_WEIGHT = {'series': 0.5, 'organizer': 0.5, 'subject': 1.5}
+
+class TaskPrior:
+    """Learned subject -> task pairings from confirmed time entries.
+
+    Pairings are kept at three levels, most specific first: the recurring
+    series ID, the normalized subject with the organizer, and the normalized
+    subject alone. Each level maps to {task_id: {'count', 'last_seen'}}.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """Create an empty prior; path=None keeps it in memory only."""
+        self.path = path
+        self.pairings: Dict[str, Dict[str, Dict]] = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> "TaskPrior":
+        """Load a prior from path, starting empty if the file is missing or invalid."""
+        prior = cls(path)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            prior.pairings = data.get('pairings', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Unable to read task history {path}: {str(e)}")
+        return prior
+
+    def save(self):
+        """Write the prior back to its file if it changed."""
+        if not self.path or not self.dirty:
+            return
+        with self._lock:
+            data = json.dumps({'version': 1, 'pairings': self.pairings}, indent=1, sort_keys=True)
+            self.dirty = False
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Unable to save task history {self.path}: {str(e)}")
+
+    @staticmethod
+    def keys(subject: str, organizer: Optional[str], series_id: Optional[str]) -> List[Tuple[str, str]]:
+        """(level, key) pairs of a meeting, most specific first."""
+        normalized = " ".join(tokenize(subject))
+        keys = []
+        if series_id:
+            keys.append(('series', f"series:{series_id}"))
+        if organizer:
+            keys.append(('organizer', f"organizer:{organizer.lower()}|{normalized}"))
+        keys.append(('subject', f"subject:{normalized}"))
+        return keys
+
+    def record(self, subject: str, organizer: Optional[str], series_id: Optional[str],
+               task_id: str, when: datetime):
+        """Record a confirmed pairing of a meeting with a task."""
+        seen = when.strftime('%Y-%m-%d')
+        with self._lock:
+            for _, key in self.keys(subject, organizer, series_id):
+                stats = self.pairings.setdefault(key, {}).setdefault(str(task_id), {'count': 0, 'last_seen': seen})
+                stats['count'] += 1
+                stats['last_seen'] = max(stats['last_seen'], seen)
+            self.dirty = True
+
+    def lookup(self, subject: str, organizer: Optional[str], series_id: Optional[str],
+               valid_task_ids: Iterable[str], now: Optional[datetime] = None) -> Optional[Tuple[str, str]]:
+        """Return (task_id, level) of a confident earlier pairing, or None.
+
+        Confirmations are weighted by their age at now (default: the
+        current time). Tasks no longer in valid_task_ids are ignored.
+        """
+        # Confirmations are stored as plain dates
+        now = (now or datetime.now()).replace(tzinfo=None)
+        valid = set(str(task_id) for task_id in valid_task_ids)
+
+        for level, key in self.keys(subject, organizer, series_id):
+            # Snapshot under the lock: backfill workers record concurrently
+            with self._lock:
+                candidates = {task_id: dict(stats) for task_id, stats in self.pairings.get(key, {}).items()}
+            if not candidates:
+                continue
+
+            weights = {}
+            for task_id, stats in candidates.items():
+                if task_id not in valid:
+                    continue
+                age_days = max(0, (now - datetime.strptime(stats['last_seen'], '%Y-%m-%d')).days)
+                weights[task_id] = stats['count'] * 0.5 ** (age_days / HALF_LIFE_DAYS)
+            if not weights:
+                continue
+
+            best = max(weights, key=weights.get)
+            if weights[best] >= MIN_WEIGHT[level] and weights[best] / sum(weights.values()) >= MIN_SHARE:
+                return best, level
+        return None
+
+    def task_usage(self) -> Dict[str, int]:
+        """Confirmed meetings per task (counted at the subject level)."""
+        usage = {}
+        with self._lock:
+            for key, candidates in self.pairings.items():
+                if not key.startswith('subject:'):
+                    continue
+                for task_id, stats in candidates.items():
+                    usage[task_id] = usage.get(task_id, 0) + stats['count']
+        return usage
@@ -0,0 +1,83 @@
+import hashlib
+import re
+import sys
+import unicodedata
+import urllib.parse
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
+# Precompiled patterns shared by every text helper
+NON_ASCII_RE = re.compile(r'[^\x00-\x7F]+')
+MEETING_ID_RE = re.compile(r"19:meeting_([^@]+)@thread\.v2")
+ORGANIZER_OID_RE = re.compile(r'"Oid":"([^"]+)"')
+
+# Minimum word length kept by the tokenizer
+MIN_WORD_LENGTH = 3
+
+class JoinUrlInfo(NamedTuple):
+    meeting_id: str
+    organizer_oid: str
+
+def normalize_text(text: str, remove_emoji: bool = False) -> str:
+    """Collapse whitespace and optionally fold text to ASCII.
+
+    Folding decomposes accented and compatibility characters (NFKD) so
+    "Café" keeps its letters as "Cafe"; what has no ASCII form (emoji) is
+    dropped.
+    """
+    if not text:
+        return "Untitled"
+
+    # Fast path: plain ASCII text has nothing to fold
+    if remove_emoji and not text.isascii():
+        text = NON_ASCII_RE.sub('', unicodedata.normalize('NFKD', text))
+
+    # str.split() splits on the same characters as \s and drops the ends
+    text = ' '.join(text.split())
+
+    return text if text else "Untitled"
+
+@lru_cache(maxsize=4096)
+def cached_normalize(text: str, remove_emoji: bool = False) -> str:
+    """Memoized normalize_text for strings that repeat across a run."""
+    return normalize_text(text, remove_emoji)
+
+@lru_cache(maxsize=4096)
+def tokenize(text: str) -> Tuple[str, ...]:
+    """Return the lowercase match words of a title, subject or project name.
+
+    Words shorter than three characters and pure numbers are dropped.
+    Words are interned, so every task and subject sharing a word shares one
+    string and set lookups compare by identity first.
+    """
+    return tuple(
+        sys.intern(word.lower()) for word in cached_normalize(text, True).split()
+        if len(word) >= MIN_WORD_LENGTH and not word.isdigit()
+    )
+
+@lru_cache(maxsize=1024)
+def parse_join_url(join_url: str) -> JoinUrlInfo:
+    """Extract the thread meeting ID and organizer OID from a Teams join URL."""
+    decoded_url = urllib.parse.unquote(join_url)
+
+    meeting_id_match = MEETING_ID_RE.search(decoded_url)
+    if not meeting_id_match:
+        raise ValueError("Could not extract meeting ID from URL")
+
+    organizer_match = ORGANIZER_OID_RE.search(decoded_url)
+    if not organizer_match:
+        raise ValueError("Could not extract organizer ID from URL")
+
+    return JoinUrlInfo(
+        meeting_id=f"19:meeting_{meeting_id_match.group(1)}@thread.v2",
+        organizer_oid=organizer_match.group(1)
+    )
+
+def description_fingerprint(description: str) -> str:
+    """Short stable hash of a time entry description.
+    
+    Case, whitespace and non-ASCII characters are ignored, matching what
+    IntervalsClient.post_time_entry sends.
+    """
+    normalized = normalize_text(description or "", remove_emoji=True).lower()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
@@ -1,24 +1,12 @@
-import re
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import json
 from typing import Optional, Dict, Any
 import base64
+from text_utils import cached_normalize
 
 def clean_text(text: str, remove_emoji: bool = False) -> str:
     """Clean and normalize text."""
-    if not text:
-        return "Untitled"
-    
-    # Remove emojis if specified
-    if remove_emoji:
-        text = re.sub(r'[^\x00-\x7F]+', '', text)
-    
-    # Clean whitespace
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'[\r\n]+', ' ', text)
-    text = text.strip()
-    
-    return text if text else "Untitled"
+    return cached_normalize(text, remove_emoji)
 
 def format_duration(total_seconds: int) -> str:
     """Format duration in seconds to human readable string."""
@@ -55,8 +43,21 @@ def get_saved_intervals_token() -> Optional[str]:
         return None
 
 def parse_datetime(date_str: str) -> datetime:
-    """Parse datetime string to datetime object."""
-    return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+    """Parse datetime string to datetime object.
+    
+    Graph sends 7 fractional digits, which fromisoformat only accepts from
+    Python 3.11 on; the fraction is cut to microseconds.
+    """
+    date_str = date_str.replace('Z', '+00:00')
+    if '.' in date_str:
+        head, fraction = date_str.split('.', 1)
+        digits = len(fraction) - len(fraction.lstrip('0123456789'))
+        date_str = f"{head}.{fraction[:min(digits, 6)].ljust(6, '0')}{fraction[digits:]}"
+    return datetime.fromisoformat(date_str)
+
+def as_utc(dt: datetime) -> datetime:
+    """Treat naive datetimes (Graph's default) as UTC."""
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
 
 def to_intervals_date(dt: datetime) -> str:
     """Convert datetime to Intervals API date format."""
@@ -0,0 +1,342 @@
+import heapq
+import queue
+import secrets
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from metrics import metrics
+from models import Meeting
+from notification_receiver import Notification, NotificationReceiver
+from utils import as_utc
+
+# Look for the attendance report this long after a meeting ends
+ATTENDANCE_DELAY = timedelta(minutes=2)
+# Look again this often while the report is not there yet
+ATTENDANCE_RETRY = timedelta(minutes=2)
+# Stop waiting for the report and use the scheduled duration after this
+ATTENDANCE_TIMEOUT = timedelta(hours=1)
+# Delta sync interval; the safety net for missed notifications
+DELTA_SYNC_INTERVAL = timedelta(minutes=15)
+# Calendar window covered by the delta sync, around now
+LOOKBACK = timedelta(days=1)
+LOOKAHEAD = timedelta(days=1)
+# Graph caps calendar subscriptions at about three days
+SUBSCRIPTION_LIFETIME = timedelta(days=2)
+SUBSCRIPTION_RENEW_BEFORE = timedelta(hours=6)
+SUBSCRIPTION_RETRY = timedelta(minutes=5)
+# Re-read the task list from Intervals this often
+TASK_REFRESH_INTERVAL = timedelta(hours=6)
+# Longest sleep of the main loop
+MAX_WAIT_SECONDS = 60.0
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _naive_utc(dt: datetime) -> datetime:
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+class MeetingWatcher:
+    """Log meetings shortly after they end, driven by change notifications.
+
+    The processor is initialized once, so the task context, AI answers and
+    HTTP sessions stay warm between meetings. Graph change notifications
+    schedule each event for processing once it has ended and its
+    attendance report is available. A calendar delta sync over the last
+    day runs periodically as the safety net for missed notifications, and
+    is the only source when no receiver is configured. Time entries already
+    in Intervals are skipped, so repeated notifications and restarts do not
+    post twice.
+    """
+
+    def __init__(self, processor, listen: Optional[Tuple[str, int]] = None,
+                 public_url: Optional[str] = None,
+                 delta_interval: timedelta = DELTA_SYNC_INTERVAL,
+                 attendance_delay: timedelta = ATTENDANCE_DELAY,
+                 attendance_retry: timedelta = ATTENDANCE_RETRY,
+                 attendance_timeout: timedelta = ATTENDANCE_TIMEOUT,
+                 metrics_path: Optional[str] = None):
+        """Create a watcher around an uninitialized MeetingProcessor.
+
+        listen=(host, port) starts the notification receiver; Graph posts
+        to public_url, which defaults to the receiver's own URL.
+        """
+        self.processor = processor
+        self.client_state = secrets.token_urlsafe(16)
+        self.receiver = NotificationReceiver(self.client_state, *listen) if listen else None
+        self.public_url = public_url
+        self.delta_interval = delta_interval
+        self.attendance_delay = attendance_delay
+        self.attendance_retry = attendance_retry
+        self.attendance_timeout = attendance_timeout
+        self.metrics_path = metrics_path
+
+        self.pending: Dict[str, Tuple[datetime, Meeting]] = {}  # Event ID -> (due, meeting)
+        self.schedule: List[Tuple[datetime, str]] = []  # Heap of (due, event ID)
+        self.processed: Dict[str, datetime] = {}  # Event ID -> start of the logged occurrence
+        self.delta_link = None
+        self.delta_started = None
+        self.next_delta = None
+        self.subscription_id = None
+        self.subscription_renew_at = None
+        self.tasks_refreshed = None
+        self.stopping = threading.Event()
+
+    @property
+    def graph_client(self):
+        return self.processor.graph_client
+
+    def stop(self):
+        """Ask the main loop to finish; safe to call from a signal handler."""
+        self.stopping.set()
+        if self.receiver:
+            self.receiver.queue.put(None)
+
+    def run(self) -> bool:
+        """Watch until stop() is called; False if initialization failed."""
+        processor = self.processor
+        with processor.timed('initialize'):
+            if not processor.initialize():
+                return False
+        processor.open_export()
+
+        now = utc_now()
+        if self.receiver:
+            self.receiver.start()
+            print(f"Listening for change notifications on {self.receiver.url}")
+            self.subscribe(now)
+        self.next_delta = now
+        self.tasks_refreshed = now
+        print("Watching for ended meetings (Ctrl+C to stop)...")
+
+        try:
+            while not self.stopping.is_set():
+                now = utc_now()
+                if now >= self.next_delta:
+                    self.graph_client.refresh_token()
+                    self.delta_sync(now)
+                    self.next_delta = now + self.delta_interval
+                if self.subscription_renew_at and now >= self.subscription_renew_at:
+                    self.subscribe(now)
+                if now - self.tasks_refreshed >= TASK_REFRESH_INTERVAL:
+                    self.refresh_tasks(now)
+                self.process_due(now)
+                self.wait(now)
+        finally:
+            self.shutdown()
+        return True
+
+    def wait(self, now: datetime):
+        """Sleep until the next scheduled work, handling notifications meanwhile."""
+        wakeups = [self.next_delta]
+        if self.schedule:
+            wakeups.append(self.schedule[0][0])
+        if self.subscription_renew_at:
+            wakeups.append(self.subscription_renew_at)
+        timeout = min(MAX_WAIT_SECONDS, max(0.0, (min(wakeups) - now).total_seconds()))
+
+        if not self.receiver:
+            self.stopping.wait(timeout)
+            return
+        try:
+            notification = self.receiver.queue.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            # None only wakes the loop up (see stop)
+            if notification is not None:
+                self.handle_notification(notification)
+            try:
+                notification = self.receiver.queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def handle_notification(self, notification: Notification):
+        now = utc_now()
+        change_type = notification.change_type
+        if change_type in ('reauthorizationRequired', 'subscriptionRemoved'):
+            self.graph_client.refresh_token()
+            self.subscribe(now)
+            return
+        if change_type == 'missed':
+            self.next_delta = now
+            return
+        if not notification.event_id:
+            return
+        if change_type == 'deleted':
+            self.unschedule(notification.event_id)
+            return
+
+        try:
+            meeting = self.graph_client.get_event(notification.event_id)
+        except Exception as e:
+            print(f"Error fetching changed event: {str(e)}")
+            # Let the delta sync pick the change up
+            self.next_delta = now
+            return
+        if meeting is None:
+            self.unschedule(notification.event_id)
+        elif meeting.is_series_master:
+            # An edited series: its occurrences come in through the delta sync
+            self.next_delta = now
+        else:
+            self.schedule_meeting(meeting, now)
+
+    def schedule_meeting(self, meeting: Meeting, now: datetime):
+        """Queue a meeting to be processed once it has ended."""
+        event_id = meeting.event_id
+        if not event_id or meeting.is_series_master:
+            return
+        if meeting.is_cancelled:
+            self.unschedule(event_id)
+            return
+        if self.processed.get(event_id) == meeting.start:
+            return
+
+        end = as_utc(meeting.end)
+        if end > now + LOOKAHEAD:
+            # Too far ahead; a later delta sync brings it back
+            return
+        due = end + self.attendance_delay
+        self.pending[event_id] = (due, meeting)
+        heapq.heappush(self.schedule, (due, event_id))
+
+    def unschedule(self, event_id: str):
+        # The heap entry is skipped once it no longer matches pending
+        self.pending.pop(event_id, None)
+
+    def process_due(self, now: datetime):
+        """Process the ended meetings whose attendance report is in."""
+        batch = []
+        while self.schedule and self.schedule[0][0] <= now:
+            due, event_id = heapq.heappop(self.schedule)
+            entry = self.pending.get(event_id)
+            if entry is None or entry[0] != due:
+                continue
+            meeting = entry[1]
+
+            if meeting.join_url and now < as_utc(meeting.end) + self.attendance_timeout:
+                try:
+                    status = self.graph_client.attendance_status(meeting.join_url, meeting.start, meeting.end)
+                except Exception as e:
+                    print(f"Error checking attendance report: {str(e)}")
+                    status = 'pending'
+                if status == 'pending':
+                    retry = now + self.attendance_retry
+                    self.pending[event_id] = (retry, meeting)
+                    heapq.heappush(self.schedule, (retry, event_id))
+                    continue
+
+            del self.pending[event_id]
+            batch.append(meeting)
+
+        if batch:
+            self.process_batch(batch)
+
+    def process_batch(self, meetings: List[Meeting]):
+        processor = self.processor
+        try:
+            with processor.timed('existing_entries'):
+                processor.load_existing_entries(meetings)
+        except Exception as e:
+            print(f"Error reading existing time entries: {str(e)}")
+            retry = utc_now() + self.attendance_retry
+            for meeting in meetings:
+                self.pending[meeting.event_id] = (retry, meeting)
+                heapq.heappush(self.schedule, (retry, meeting.event_id))
+            return
+
+        for meeting in meetings:
+            try:
+                with processor.timed('process'):
+                    result = processor.handle_meeting(meeting)
+            except Exception as e:
+                print(f"Error processing meeting {meeting.subject}: {str(e)}")
+                metrics.inc('watch_errors_total')
+                continue
+
+            self.processed[meeting.event_id] = meeting.start
+            metrics.observe('watch_lag_seconds', (utc_now() - as_utc(meeting.end)).total_seconds())
+            if result:
+                print(f"Logged: {result.meeting} -> {result.task_title} ({result.posted})")
+
+        if processor.task_matcher.prior:
+            processor.task_matcher.prior.save()
+        # A daemon must not grow with every meeting it sees
+        processor.results.clear()
+        processor.task_matcher.trim_caches()
+        self.graph_client.attendance_reports.clear()
+        cutoff = utc_now() - 2 * LOOKBACK
+        self.processed = {k: start for k, start in self.processed.items() if as_utc(start) >= cutoff}
+        if self.metrics_path:
+            metrics.write(self.metrics_path)
+
+    def delta_sync(self, now: datetime):
+        """Schedule the events changed since the last sync.
+
+        The window restarts (with a new baseline) once a day, so it keeps
+        covering the last LOOKBACK and the next LOOKAHEAD.
+        """
+        if self.delta_link is None or now - self.delta_started >= LOOKBACK:
+            self.delta_link = None
+            self.delta_started = now
+
+        try:
+            with self.processor.timed('delta_sync'):
+                meetings, removed, self.delta_link = self.graph_client.get_calendar_delta(
+                    _naive_utc(self.delta_started - LOOKBACK),
+                    _naive_utc(self.delta_started + LOOKBACK + LOOKAHEAD),
+                    self.delta_link
+                )
+        except Exception as e:
+            print(f"Error in calendar delta sync: {str(e)}")
+            # An expired delta token needs a new baseline
+            self.delta_link = None
+            return
+
+        metrics.inc('delta_sync_total')
+        for event_id in removed:
+            self.unschedule(event_id)
+        for meeting in meetings:
+            self.schedule_meeting(meeting, now)
+
+    def subscribe(self, now: datetime):
+        """Create or renew the change notification subscription."""
+        expiration = now + SUBSCRIPTION_LIFETIME
+        if self.subscription_id and self.graph_client.renew_subscription(self.subscription_id, expiration):
+            self.subscription_renew_at = expiration - SUBSCRIPTION_RENEW_BEFORE
+            return
+
+        notification_url = self.public_url or self.receiver.url
+        subscription = self.graph_client.create_subscription(notification_url, self.client_state, expiration)
+        if subscription:
+            self.subscription_id = subscription['id']
+            self.subscription_renew_at = expiration - SUBSCRIPTION_RENEW_BEFORE
+            print(f"Subscribed to calendar changes ({notification_url})")
+        else:
+            self.subscription_id = None
+            self.subscription_renew_at = now + SUBSCRIPTION_RETRY
+            print("Change notifications unavailable; relying on the delta sync")
+
+    def refresh_tasks(self, now: datetime):
+        """Pick up tasks added in Intervals since startup."""
+        processor = self.processor
+        self.tasks_refreshed = now
+        try:
+            tasks = processor.intervals_client.get_tasks()
+        except Exception as e:
+            print(f"Error refreshing tasks: {str(e)}")
+            return
+        if tasks:
+            processor.tasks = tasks
+            processor.task_matcher.build_task_context(tasks, processor.intervals_client)
+
+    def shutdown(self):
+        if self.subscription_id:
+            self.graph_client.delete_subscription(self.subscription_id)
+            self.subscription_id = None
+        if self.receiver:
+            self.receiver.stop()
+        if self.processor.task_matcher and self.processor.task_matcher.prior:
+            self.processor.task_matcher.prior.save()
+        self.processor.close_export()
+        print("Watch mode stopped")